@@ -1,23 +1,10 @@
 import streamlit as st
-from bs4 import BeautifulSoup
 from app.utils.storage import is_saved, toggle_save
+from app.utils.card_fields import render_fields
+from app.utils.thumbs import thumb_src
 from hashlib import md5
-
-def _extract_image_and_text(summary_html: str):
-    if not summary_html:
-        return None, ""
-    try:
-        soup = BeautifulSoup(summary_html, "html.parser")
-        img_url = None
-        img_tag = soup.find("img")
-        if img_tag and img_tag.get("src"):
-            img_url = img_tag.get("src")
-        for tag in soup(["script", "style"]):
-            tag.extract()
-        text = soup.get_text(separator=" ", strip=True)
-        return img_url, text
-    except Exception:
-        return None, summary_html
+from app.components.compat import fragment
+from app.utils.rerun_profile import stage
 
 def _safe_key(s: str) -> str:
     return md5(s.encode("utf-8")).hexdigest()
@@ -34,18 +21,29 @@ def _columns(spec):
         # Versiones sin 'gap'
         return st.columns(spec)
 
+@fragment
+def _save_toggle(article: dict, art_id: str, art_key: str):
+    # Fragmento: pulsar ⭐ solo re-ejecuta este botón, no la página ni el resto de tarjetas.
+    # El callback guarda antes del rerun, así la etiqueta ya sale actualizada.
+    saved_now = is_saved(art_id)
+    btn_label = "⭐ Guardar" if not saved_now else "❌ Quitar de guardadas"
+    st.button(btn_label, key=f"save_{art_key}", on_click=toggle_save, args=({**article, "id": art_id},))
+
 def render_article(article: dict):
+    with stage("card"):
+        _render_article(article)
+
+def _render_article(article: dict):
     title = article.get("title", "Sin título")
     category = article.get("category") or "Sin categoría"
     link = article.get("link", "")
-    summary_html = article.get("summary", "")
 
     art_id = article.get("id") or link or title
     art_key = _safe_key(art_id)
 
-    img_url, clean_text = _extract_image_and_text(summary_html)
-    max_chars = 280
-    short_text = (clean_text[:max_chars] + "…") if len(clean_text) > max_chars else clean_text
+    # Campos precalculados por el colector (o extractor memoizado para entradas antiguas)
+    with stage("card.fields"):
+        img_url, short_text = render_fields(article)
 
     with st.container(border=True):
         # ✅ Título clicable
@@ -55,10 +53,13 @@ def render_article(article: dict):
 
         col_img, col_txt = _columns([1, 2])
         with col_img:
-            if img_url:
+            # Miniatura local (static/thumbs, la genera el colector); si no hay, la imagen original
+            with stage("card.thumb"):
+                img_src = thumb_src(article) or img_url
+            if img_src:
                 # ✅ Imagen clicable
                 st.markdown(
-                    f'<a href="{link}" target="_blank"><img src="{img_url}" style="width:100%; border-radius:8px;"/></a>',
+                    f'<a href="{link}" target="_blank"><img src="{img_src}" loading="lazy" style="width:100%; border-radius:8px;"/></a>',
                     unsafe_allow_html=True
                 )
 
@@ -76,10 +77,8 @@ def render_article(article: dict):
             for it in ideas:
                 st.write(f"• {it}")
 
-        saved_now = is_saved(art_id)
-        btn_label = "⭐ Guardar" if not saved_now else "❌ Quitar de guardadas"
-        if st.button(btn_label, key=f"save_{art_key}"):
-            toggle_save({**article, "id": art_id})
+        with stage("card.save_toggle"):
+            _save_toggle(article, art_id, art_key)
 
         if link:
             st.markdown(f"[🌐 Ver noticia original]({link})")
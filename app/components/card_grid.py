@@ -0,0 +1,39 @@
+import os
+import streamlit as st
+from app.components.card import render_article, _columns
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+# Tarjetas por página (RADAR_PAGE_SIZE); "Cargar más" añade otra página
+PAGE_SIZE = max(1, _env_int("RADAR_PAGE_SIZE", 20))
+
+def _show_more(state_key: str, step: int):
+    st.session_state[state_key] += step
+
+def render_grid(articles: list, key: str, page_size: int = PAGE_SIZE) -> bool:
+    """
+    Pinta `articles` en dos columnas, solo las páginas ya pedidas: el coste de un
+    rerun depende de lo visible, no del tamaño del feed. `key` separa el contador de
+    páginas de cada vista (categoría, búsqueda…). Devuelve True si ya se ve todo.
+    """
+    state_key = f"grid_visible_{key}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = page_size
+    visible = st.session_state[state_key]
+
+    left, right = _columns(2)
+    for i, art in enumerate(articles[:visible]):
+        with (left if i % 2 == 0 else right):
+            render_article(art)
+            st.markdown("---")
+
+    remaining = len(articles) - visible
+    if remaining > 0:
+        st.button(f"Cargar más ({remaining} restantes)", key=f"more_{key}",
+                  on_click=_show_more, args=(state_key, page_size))
+        return False
+    return True
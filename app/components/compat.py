@@ -0,0 +1,16 @@
+import streamlit as st
+
+def fragment(func=None, *, run_every=None):
+    """
+    st.fragment (o st.experimental_fragment en 1.33–1.36) si existe: la función se
+    re-ejecuta sola al interactuar con sus widgets, sin rerun del script entero.
+    En versiones anteriores es una llamada normal.
+    """
+    impl = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+    def wrap(f):
+        if impl is None:
+            return f
+        return impl(f, run_every=run_every) if run_every else impl(f)
+
+    return wrap(func) if func is not None else wrap
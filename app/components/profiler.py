@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+import streamlit as st
+from app.utils import rerun_profile
+from app.utils.jsonio import append_jsonl
+
+def profiling_enabled() -> bool:
+    """AURA_PROFILE=1 en el servidor o ?profile=1 en la URL."""
+    if rerun_profile.env_enabled():
+        return True
+    try:
+        return st.query_params.get("profile", "") in ("1", "true")
+    except AttributeError:
+        return False  # Streamlit sin st.query_params
+
+def _render(summary: dict):
+    with st.sidebar.expander(f"⏱ Rerun: {summary['total_ms']:.0f} ms", expanded=False):
+        rows = [f"| {name} | {v['ms']:.1f} | {v['n']} |" for name, v in summary["stages"].items()]
+        st.markdown("| etapa | ms | veces |\n|---|---:|---:|\n" + "\n".join(rows) if rows else "Sin etapas.")
+        if summary["counters"]:
+            st.caption(" · ".join(f"{k}: {v}" for k, v in summary["counters"].items()))
+        st.caption(f"build {summary['build'] or '?'} → {rerun_profile.PROFILE_LOG_PATH}")
+
+@contextmanager
+def profiled_page(page: str):
+    """
+    Perfila el rerun completo de una página: tiempos por etapa (rerun_profile.stage)
+    y lecturas/parseos contados en jsonio, storage, card_fields y thumbs.
+    Al terminar, desglose en un expander de la barra lateral y una línea en el JSONL.
+    Sin perfilado activado no hace nada.
+    """
+    if not profiling_enabled():
+        yield
+        return
+    rerun_profile.start(page)
+    completed = False
+    try:
+        yield
+        completed = True
+    finally:
+        # st.rerun()/st.stop() cortan el script con una excepción: se registra, pero no se pinta
+        summary = rerun_profile.stop().as_dict()
+        summary["completed"] = completed
+        append_jsonl(rerun_profile.PROFILE_LOG_PATH, summary)
+        if completed:
+            _render(summary)
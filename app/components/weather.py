@@ -1,8 +1,15 @@
 import time
 import streamlit as st
+from app.components.compat import fragment
+from app.components.card_grid import _env_int
 
+# Cada cuánto se recarga el widget (s, mínimo 60). Entre medias el iframe no cambia y los reruns no lo tocan.
+WEATHER_REFRESH_SECONDS = max(60, _env_int("WEATHER_REFRESH_SECONDS", 900))
+
+@fragment(run_every=WEATHER_REFRESH_SECONDS)
 def render_weather():
-    bust = int(time.time())
+    # Versión por intervalo, no por rerun: misma URL → el navegador no recarga el iframe
+    bust = int(time.time() // WEATHER_REFRESH_SECONDS)
     st.markdown(
         f"""
         <iframe src="https://<tu-usuario>.github.io/malaga-weather-widget/?v={bust}"
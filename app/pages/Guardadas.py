@@ -1,17 +1,18 @@
 import streamlit as st
 from app.utils.storage import get_saved
-from app.components.card import render_article
+from app.components.card_grid import render_grid
+from app.components.profiler import profiled_page
+from app.utils.rerun_profile import stage
 
 st.set_page_config(page_title="Guardadas", layout="wide")
 st.title("🗂 Noticias guardadas")
 
-saved = get_saved()
+with profiled_page("guardadas"):
+    with stage("guardadas.load"):
+        saved = get_saved()
 
-if not saved:
-    st.info("Todavía no tienes noticias guardadas. En el Radar puedes marcar ⭐ Guardar en cualquier tarjeta.")
-else:
-    col1, col2 = st.columns(2, gap="large")
-    for i, art in enumerate(saved):
-        with (col1 if i % 2 == 0 else col2):
-            render_article(art)
-            st.markdown("---")
+    if not saved:
+        st.info("Todavía no tienes noticias guardadas. En el Radar puedes marcar ⭐ Guardar en cualquier tarjeta.")
+    else:
+        with stage("guardadas.grid"):
+            render_grid(saved, key="guardadas_page")
@@ -1,51 +1,65 @@
-import json
 import streamlit as st
 from app.components.filters import category_filter
-from app.components.card import render_article
+from app.components.card_grid import render_grid
 from app.components.weather import render_weather
-from app.utils.storage import get_saved
+from app.utils.storage import get_saved, is_saved
+from app.utils.trends_view import articles_for, older_months, default_months, search_articles
+from app.utils.rerun_profile import stage
+from app.components.profiler import profiled_page
 
 st.set_page_config(page_title="Aura Dashboard", layout="wide")
 
 
-def _load_trends(path: str = "data/trends.json"):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f) or []
-            return data if isinstance(data, list) else []
-    except Exception:
-        return []
-
-
-def _columns(spec):
-    try:
-        return st.columns(spec, gap="large")
-    except TypeError:
-        return st.columns(spec)
-
-
 def main():
+    # ?profile=1 / AURA_PROFILE=1: desglose de tiempos del rerun en la barra lateral
+    with profiled_page("radar"):
+        _main()
+
+def _main():
     st.title("Aura Dashboard")
-    render_weather()
+    with stage("radar.weather"):
+        render_weather()
+
+    query = st.text_input("Buscar", placeholder="Michelin, Picasso, terrazas…",
+                          key="search_query", label_visibility="collapsed").strip()
+    with stage("radar.filters"):
+        selected = category_filter()  # Siempre es string, por filters.py
+    # Meses de histórico cargados (shards de data/trends/); crece con "Cargar mes anterior"
+    if "trend_months" not in st.session_state:
+        st.session_state.trend_months = default_months()
+    months = st.session_state.trend_months
 
-    selected = category_filter()  # Siempre es string, por filters.py
-    if selected == "guardadas":
-        articles = get_saved()
+    if query:
+        # Índice BM25 del colector (incluye el archivo); por relevancia, no por fecha
+        with stage("radar.search"):
+            if selected == "guardadas":
+                articles = [a for a in search_articles(query, limit=200) if is_saved(a.get("id"))]
+            else:
+                articles = search_articles(query, selected)
+        older = 0
+        if not articles:
+            st.info(f"Sin resultados para «{query}».")
+            return
+    elif selected == "guardadas":
+        # Lo último guardado primero
+        with stage("radar.load_saved"):
+            articles = list(reversed(get_saved()))
+        older = 0
     else:
-        articles = _load_trends()
-        if selected != "todas":
-            s = (selected or "todas").lower()
-            articles = [a for a in articles if (a.get("category") or "").lower() == s]
+        # Vista cacheada por shard: ya viene filtrada por categoría y ordenada por `published`
+        with stage("radar.load_trends"):
+            articles = articles_for(selected, months)
+            older = older_months(months)
 
-    if not articles:
+    if not articles and not older:
         st.info("Aún no hay artículos para mostrar. Cuando el colector procese nuevos, aparecerán aquí.")
         return
 
-    # Ordenar para que lo más reciente aparezca primero
-    articles = list(reversed(articles))
+    # Paginado: cada vista (categoría / búsqueda) lleva su propio "Cargar más"
+    with stage("radar.grid"):
+        all_visible = render_grid(articles, key=f"{selected}:{query.lower()}")
 
-    left, right = _columns(2)
-    for i, art in enumerate(articles):
-        with (left if i % 2 == 0 else right):
-            render_article(art)
-            st.markdown("---")
+    if older and all_visible:
+        if st.button(f"Cargar mes anterior ({older} más en el histórico)"):
+            st.session_state.trend_months = months + 1
+            st.rerun()
@@ -1,9 +1,16 @@
 import os
-import time
 import json
 import re
-import google.generativeai as genai
+import hashlib
+import threading
 from google.api_core.exceptions import ResourceExhausted, DeadlineExceeded, ServiceUnavailable
+from app.utils.key_pool import KeyPool, seconds_per_call, requests_per_day
+from app.utils.key_ledger import KeyLedger
+from app.utils.llm_cache import ResponseCache
+from app.utils.llm_backends import get_backend
+from app.utils import run_metrics
+from app.utils.prompt_budget import article_block, BATCH_SUMMARY_TOKENS
+from app.utils.textnorm import fold
 
 # ─────────────────────────────────────────────────────────────
 # Gestión de claves y ritmo
@@ -25,12 +32,44 @@ def _load_api_keys():
 _API_KEYS = _load_api_keys()
 print(f"🔑 Gemini keys detected: {len(_API_KEYS)}")
 
-def _configure_with_key(key: str):
-    genai.configure(api_key=key)
+_MODEL_NAME = "gemini-1.5-flash"
 
 def _pause_seconds() -> float:
-    # Fijamos 12s para ir muy por debajo del límite por minuto
-    return 12.0
+    # GEMINI_SECONDS_PER_CALL / GEMINI_RPM_PER_KEY (12s por defecto, muy por debajo del límite)
+    return seconds_per_call()
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _key_pool() -> KeyPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = KeyPool(_API_KEYS, _pause_seconds(), ledger=KeyLedger())
+        return _POOL
+
+def key_count() -> int:
+    return len(_API_KEYS)
+
+def call_capacity(seconds: float = None) -> dict:
+    """
+    Lo que queda hoy según el ledger: {"live_keys", "calls_left_today", "calls_in_time"}.
+    calls_in_time = llamadas que caben en `seconds` al ritmo de cada clave (None sin límite).
+    """
+    pool = _key_pool()
+    live = pool.live_keys()
+    rpd = requests_per_day()
+    left = sum(max(0, rpd - pool.ledger.calls_today(k)) for k in live) if rpd else None
+    in_time = None
+    if seconds is not None and pool.interval > 0:
+        in_time = int(len(live) * (1 + seconds / pool.interval))
+    return {"live_keys": len(live), "calls_left_today": left, "calls_in_time": in_time}
+
+# Caché de respuestas (data/llm_cache): se consulta antes de cualquier llamada de red
+_CACHE = ResponseCache()
+
+def cache_summary() -> str:
+    return _CACHE.summary()
 
 def _is_invalid_key_error(err: Exception) -> bool:
     msg = str(err).lower()
@@ -68,85 +107,111 @@ def _classify_429(err: Exception):
         return "day", retry_delay
     return "unknown", retry_delay
 
-def _backoff_sleep(seconds: float):
-    # Límite razonable
-    seconds = max(1.0, min(float(seconds), 300.0))
-    print(f"⏳ Backoff {seconds:.0f}s…", flush=True)
-    time.sleep(seconds)
-
 # ─────────────────────────────────────────────────────────────
 # Llamada base a Gemini
 # ─────────────────────────────────────────────────────────────
-def _try_generate(prompt: str) -> str:
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    resp = model.generate_content(prompt)
-    return (resp.text or "").strip()
+# AURA_LLM_BACKEND=fake → doble local (latencia, cuotas, 429/503 simulados) sin red
+_BACKEND = get_backend()
 
-def _generate_single_pass(prompt: str) -> str:
+class GenerationError(Exception):
     """
-    Prueba cada clave en orden (máx. una vuelta), con reintentos en 429 por minuto.
-    - 429 PerMinute → esperar retry_delay (o ~65s) y reintentar la misma clave (hasta 2 veces por clave).
-    - 429 PerDay → marcar la clave como agotada para hoy y pasar a la siguiente.
-    - 429 unknown → backoff corto (30s) y reintentar una vez.
-    - Otras excepciones transitorias (timeout/503) → intentar siguiente clave.
+    Fallo del modelo que no es de cuota (respuesta bloqueada, error interno, JSON ilegible…).
+    No equivale a "no relevante": el colector devuelve esas noticias a la cola.
+    """
+
+def _try_generate(key: str, prompt: str, schema: dict = None) -> str:
+    text, usage = _BACKEND.generate(key, _MODEL_NAME, prompt, schema=schema)
+    # Tokens reales (usage_metadata) por ejecución y por clave → data/run_metrics.json
+    run_metrics.incr("gemini.tokens_in", usage.get("prompt_tokens", 0), key=key)
+    run_metrics.incr("gemini.tokens_out", usage.get("output_tokens", 0), key=key)
+    return text
+
+def _generate_single_pass(prompt: str, schema: dict = None, accept=None) -> str:
+    """
+    Envía el prompt con la primera clave que tenga capacidad (cubo de tokens por clave).
+    Con `schema`, la respuesta se pide en modo JSON contra ese esquema.
+    Antes mira la caché en disco (mismo modelo + mismo prompt → misma respuesta, sin red).
+    `accept(text)` → solo se cachea lo que el llamante da por bueno: una respuesta
+    rechazada no se guarda (y si ya estaba en caché, se descarta y se vuelve a pedir),
+    así los reintentos llegan de verdad al modelo.
+    - 429 PerMinute → esa clave queda en pausa retry_delay (o ~65s); el resto sigue
+      trabajando y el prompt se reintenta (hasta 2 veces por clave).
+    - 429 PerDay → clave fuera hasta el reinicio de cuota (queda en data/key_health.json).
+    - 429 unknown → pausa corta (30s) de esa clave y un reintento.
+    - Otras excepciones transitorias (timeout/503) → intentar otra clave.
+    - Inválida/expirada → fuera para siempre (ledger).
+    - Cualquier otro error → GenerationError (el llamante decide; nunca se toma por "false").
     - Si ninguna clave sirve → ResourceExhausted.
     """
+    cache_prompt = prompt if schema is None else f"{prompt}\n#schema {json.dumps(schema, sort_keys=True)}"
+    cached = _CACHE.get(_MODEL_NAME, cache_prompt)
+    if cached is not None:
+        if accept is None or accept(cached):
+            run_metrics.incr("gemini.cache_hit")
+            return cached
+        _CACHE.discard(_MODEL_NAME, cache_prompt)
+        run_metrics.incr("gemini.cache_rejected")
     if not _API_KEYS:
         raise ResourceExhausted("No valid API keys configured.")
-    pause = _pause_seconds()
-    daily_exhausted = set()
-
-    for idx, key in enumerate(_API_KEYS, start=1):
-        if key in daily_exhausted:
-            continue
-
-        _configure_with_key(key)
-        if idx > 1:
-            time.sleep(1.0)
-
-        # Hasta 2 intentos por clave si el 429 es por minuto
-        attempts_left = 2
-        while attempts_left > 0:
-            try:
-                text = _try_generate(prompt)
-                time.sleep(pause)
-                return text
-
-            except ResourceExhausted as e:
-                scope, retry_delay = _classify_429(e)
-                if scope == "minute":
-                    # backoff recomendado o ~65s y reintentamos MISMA clave
-                    wait_s = retry_delay + 2 if (retry_delay and retry_delay > 0) else 65
-                    print(f"⛽ Key #{idx} 429 PerMinute. Esperando {wait_s}s y reintentando misma clave…", flush=True)
-                    _backoff_sleep(wait_s)
-                    attempts_left -= 1
-                    continue  # reintenta misma clave
-
-                if scope == "day":
-                    print(f"⛽ Key #{idx} 429 PerDay. Marcada como agotada para hoy. Pasando a la siguiente…", flush=True)
-                    daily_exhausted.add(key)
-                    break  # salir del while → pasar a siguiente clave
-
-                # unknown 429 → backoff corto y un reintento
-                print(f"⛽ Key #{idx} 429 (scope desconocido). Backoff 30s y reintento…", flush=True)
-                _backoff_sleep(30)
-                attempts_left -= 1
+    pool = _key_pool()
+    attempts = {}      # clave → 429 por minuto/unknown con este prompt
+    skipped = set()    # claves descartadas solo para este prompt
+
+    while True:
+        key = pool.acquire(exclude=skipped)
+        if key is None:
+            # Si llegamos aquí, ninguna clave pudo responder
+            raise ResourceExhausted("All keys exhausted (minute and/or daily) for this article.")
+        idx = _API_KEYS.index(key) + 1
+
+        try:
+            pool.ledger.record_call(key)
+            run_metrics.incr("gemini.calls", key=key)
+            with run_metrics.timer("gemini.call", key=key):
+                text = _try_generate(key, prompt, schema)
+            run_metrics.incr("gemini.ok", key=key)
+            # A disco en cuanto llega (si es válida): si la ejecución se corta, no se vuelve a pagar
+            if accept is None or accept(text):
+                _CACHE.put(_MODEL_NAME, cache_prompt, text)
+            return text
+
+        except ResourceExhausted as e:
+            scope, retry_delay = _classify_429(e)
+            pool.ledger.record_429(key)
+            run_metrics.incr(f"gemini.429_{scope}", key=key)
+            if scope == "day":
+                print(f"⛽ Key #{idx} 429 PerDay. Marcada como agotada para hoy. Pasando a la siguiente…", flush=True)
+                pool.mark_dead(key, "day")
                 continue
 
-            except (DeadlineExceeded, ServiceUnavailable) as e:
-                print(f"🌐 Transient error con key #{idx}: {e}. Probando siguiente clave…", flush=True)
-                break  # pasa a siguiente clave
+            if scope == "minute":
+                # backoff recomendado o ~65s solo para ESTA clave
+                wait_s = retry_delay + 2 if (retry_delay and retry_delay > 0) else 65
+                print(f"⛽ Key #{idx} 429 PerMinute. Pausa de {wait_s}s para esta clave…", flush=True)
+            else:
+                wait_s = 30
+                print(f"⛽ Key #{idx} 429 (scope desconocido). Pausa de 30s para esta clave…", flush=True)
+            pool.cooldown(key, max(1.0, min(float(wait_s), 300.0)))
+            attempts[key] = attempts.get(key, 0) + 1
+            if attempts[key] >= 2:
+                skipped.add(key)
+            continue
 
-            except Exception as e:
-                if _is_invalid_key_error(e):
-                    print(f"⛔ Key #{idx} inválida/expirada. Saltando…", flush=True)
-                    break
-                print(f"❗ Error genérico con key #{idx}: {e} → devolviendo vacío", flush=True)
-                time.sleep(pause)
-                return ""
+        except (DeadlineExceeded, ServiceUnavailable) as e:
+            print(f"🌐 Transient error con key #{idx}: {e}. Probando siguiente clave…", flush=True)
+            run_metrics.incr("gemini.deadline" if isinstance(e, DeadlineExceeded) else "gemini.503", key=key)
+            skipped.add(key)
+            continue
 
-    # Si llegamos aquí, ninguna clave pudo responder
-    raise ResourceExhausted("All keys exhausted (minute and/or daily) for this article.")
+        except Exception as e:
+            if _is_invalid_key_error(e):
+                print(f"⛔ Key #{idx} inválida/expirada. Saltando…", flush=True)
+                run_metrics.incr("gemini.invalid_key", key=key)
+                pool.mark_dead(key, "invalid")
+                continue
+            print(f"❗ Error genérico con key #{idx}: {e}", flush=True)
+            run_metrics.incr("gemini.error", key=key)
+            raise GenerationError(str(e)) from e
 
 # ─────────────────────────────────────────────────────────────
 # Helpers de parsing
@@ -167,13 +232,7 @@ def _extract_json_block(s: str) -> str:
 # ─────────────────────────────────────────────────────────────
 # Clasificación (ES, prompt ligero)
 # ─────────────────────────────────────────────────────────────
-def is_relevant_for_aura(article: dict) -> bool:
-    title = article.get('title','')
-    summary = article.get('summary','')
-    category = article.get('category','')
-    link = article.get('link','')
-
-    prompt = f"""
+_RELEVANCE_CRITERIA = """
 Eres curador de tendencias para ME by Meliá (Málaga).
 Evalúa si esta noticia sirve para conversar con huéspedes o inspirar experiencias.
 
@@ -183,81 +242,333 @@ Di **true** solo si:
 - O muestra novedades en gastronomía, wellness, arte o diseño aplicables a hoteles de lujo.
 
 Di **false** si es demasiado local en otra ciudad, corporativo/financiero sin interés para huéspedes, o ajeno a lujo/experiencias.
+""".strip()
+
+def _version(*parts) -> str:
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:10]
+
+# Huella de modelo + prompt con la que se decide/enriquece cada noticia (relevance_version,
+# enrich_version): al cambiar el texto de un prompt cambia la huella y reprocess_trends.py
+# rehace solo lo desfasado
+RELEVANCE_VERSION = _version(_MODEL_NAME, _RELEVANCE_CRITERIA)
+
+def is_relevant_for_aura(article: dict) -> bool:
+    """Veredicto de una noticia. Respuesta vacía o sin true/false → GenerationError."""
+    prompt = f"""
+{_RELEVANCE_CRITERIA}
 
 Responde SOLO: true  o  false.
 
-Título: {title}
-Resumen: {summary}
-Categoría: {category}
-Enlace: {link}
+{article_block(article)}
 """.strip()
 
-    text = _generate_single_pass(prompt).lower()
-    if "true" in text:
-        return True
-    if "false" in text:
-        return False
-    if text == "":
-        return False
-    print(f"[IA] Unexpected response: {text!r}")
-    return False
+    text = _generate_single_pass(prompt, accept=lambda t: _single_verdict(t) is not None)
+    verdict = _single_verdict(text)
+    # Vacía o ambigua no es un "no": que el llamador la reintente como cualquier fallo
+    if verdict is None:
+        raise GenerationError(f"respuesta sin veredicto: {(text or '').strip()[:120]!r}")
+    return verdict
+
+def _single_verdict(text: str):
+    text = (text or "").strip().lower()
+    has_true, has_false = "true" in text, "false" in text
+    return None if has_true == has_false else has_true
 
 # ─────────────────────────────────────────────────────────────
-# Enriquecimiento (ES)
+# Clasificación por lotes (varias noticias en una sola llamada)
 # ─────────────────────────────────────────────────────────────
-def enrich_article_fields(article: dict) -> dict:
-    title = article.get('title','')
-    summary = article.get('summary','')
-    category = article.get('category','')
-    link = article.get('link','')
+def batch_size() -> int:
+    try:
+        return max(1, int(os.getenv("GEMINI_BATCH_SIZE", "10")))
+    except ValueError:
+        return 10
 
-    prompt = f"""
-Eres “Aura Host” en ME by Meliá (Málaga). Te paso una noticia y quiero:
+def _batch_prompt(articles: list) -> str:
+    blocks = []
+    for n, a in enumerate(articles, start=1):
+        blocks.append(f"[{n}] id: {a.get('id','')}\n{article_block(a, BATCH_SUMMARY_TOKENS)}")
+    ids_example = ", ".join(f'"{a.get("id","")}": true|false' for a in articles[:2])
+    return f"""
+{_RELEVANCE_CRITERIA}
+
+Te paso {len(articles)} noticias, cada una con su id. Evalúa cada una por separado.
+Devuelve SOLO un JSON con una entrada por id (todas las ids, sin inventar ninguna):
+
+{{{ids_example}, ...}}
+
+{chr(10).join(blocks)}
+""".strip()
+
+def _coerce_verdict(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    if isinstance(value, dict):
+        return _coerce_verdict(value.get("relevant"))
+    return None
+
+def _parse_batch_verdicts(raw: str, ids: set) -> dict:
+    """
+    Devuelve {id: bool} solo con las ids pedidas y con veredicto legible.
+    Respuestas vacías o JSON roto → {} (el llamante parte el lote).
+    """
+    try:
+        data = json.loads(_extract_json_block(raw))
+    except Exception:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    out = {}
+    for k, v in data.items():
+        verdict = _coerce_verdict(v)
+        if str(k) in ids and verdict is not None:
+            out[str(k)] = verdict
+    return out
+
+def classify_batch(articles: list, size: int = None) -> dict:
+    """
+    Clasifica varias noticias por llamada. Devuelve {id: bool}.
+    - Cada lote (máx. `size`, por defecto GEMINI_BATCH_SIZE) va en un solo prompt.
+    - Si la respuesta es parcial o no es JSON válido, las ids sin veredicto
+      se reparten en dos mitades y se reintentan; con una sola noticia se cae
+      a `is_relevant_for_aura` y, si tampoco da veredicto, su id queda fuera
+      del resultado (sin decidir, no descartada).
+    - ResourceExhausted se propaga tal cual (el colector guarda y sale).
+    """
+    size = size or batch_size()
+    verdicts = {}
+    for start in range(0, len(articles), size):
+        verdicts.update(_classify_chunk(articles[start:start + size]))
+    return verdicts
+
+def _classify_chunk(chunk: list) -> dict:
+    if not chunk:
+        return {}
+    if len(chunk) == 1:
+        art = chunk[0]
+        try:
+            return {art.get("id"): is_relevant_for_aura(art)}
+        except GenerationError as e:
+            print(f"[IA] Sin veredicto para {art.get('id')}: {e}", flush=True)
+            return {}
 
+    ids = {a.get("id") for a in chunk}
+    # Una respuesta parcial no se cachea: si el lote vuelve, se pregunta de nuevo
+    raw = _generate_single_pass(_batch_prompt(chunk), accept=lambda r: len(_parse_batch_verdicts(r, ids)) == len(ids))
+    verdicts = _parse_batch_verdicts(raw, ids)
+
+    missing = [a for a in chunk if a.get("id") not in verdicts]
+    if missing:
+        print(f"[IA] Lote parcial: {len(verdicts)}/{len(chunk)} veredictos. Partiendo {len(missing)} restantes…", flush=True)
+        half = (len(missing) + 1) // 2
+        verdicts.update(_classify_chunk(missing[:half]))
+        verdicts.update(_classify_chunk(missing[half:]))
+    return verdicts
+
+# ─────────────────────────────────────────────────────────────
+# Enriquecimiento (ES): modo JSON con esquema, validación y una reparación
+# ─────────────────────────────────────────────────────────────
+_ENRICH_FIELDS_SPEC = """
 1) "why_it_matters": 2–3 frases concisas (máx. 280 caracteres), en español,
    que expliquen por qué interesa a un huésped de lujo.
    - Si es de Málaga/España → destaca valor inmediato para la estancia.
    - Si es global → preséntala como tendencia de lujo reconocible.
 
-2) "activation_ideas": 3 frases cortas en español (máx. 12 palabras),
-   cada una empezando con un verbo (ej. "Recomendar…", "Sugerir…", "Invitar a…").
+2) "activation_ideas": exactamente 3 frases cortas en español (máx. 12 palabras),
+   cada una empezando con un verbo en infinitivo (ej. "Recomendar…", "Sugerir…", "Invitar a…").
    - Si es local → aplicables en Málaga o dentro del hotel.
    - Si es global → sirven como conversación o inspiración en el servicio.
+""".strip()
 
-Devuelve SOLO JSON válido:
+# Esquemas de respuesta (subconjunto OpenAPI de Gemini); longitudes y verbos se validan aquí
+_ENRICH_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "why_it_matters": {"type": "STRING"},
+        "activation_ideas": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["why_it_matters", "activation_ideas"],
+}
+_COMBINED_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"relevant": {"type": "BOOLEAN"}, **_ENRICH_SCHEMA["properties"]},
+    "required": ["relevant"],
+}
+
+WHY_MIN_CHARS = 40
+WHY_MAX_CHARS = 280
+IDEAS_COUNT = 3
+IDEA_MAX_WORDS = 12
+
+# Tras tantos intentos fallidos se deja de reintentar (la tarjeta sale sin why/ideas)
+ENRICH_MAX_ATTEMPTS = 3
+
+_ENRICH_INTRO = "Eres “Aura Host” en ME by Meliá (Málaga). Te paso una noticia y quiero:"
+
+ENRICH_VERSION = _version(_MODEL_NAME, _ENRICH_INTRO, _ENRICH_FIELDS_SPEC, json.dumps(_ENRICH_SCHEMA, sort_keys=True),
+                          f"{WHY_MIN_CHARS}-{WHY_MAX_CHARS}/{IDEAS_COUNT}x{IDEA_MAX_WORDS}")
+# Infinitivo, con pronombre enclítico opcional: "Recomendar", "Ofrecerles", "Invitarlos"
+_INFINITIVE_RX = re.compile(r"^[a-zñ]+(ar|er|ir)(se|le|les|lo|la|los|las|nos)?$")
+_IDEA_PREFIX_RX = re.compile(r"^\s*(?:[-•*]|\d+[.)])\s*")
+
+def _verb_first(idea: str) -> bool:
+    words = fold(idea).split()
+    return bool(words) and bool(_INFINITIVE_RX.match(words[0].strip("¡¿\"'.,:;")))
+
+def validate_enrichment(data) -> tuple:
+    """
+    (campos válidos, problemas). Los campos válidos se devuelven aunque falte otro:
+    why_it_matters de WHY_MIN_CHARS a WHY_MAX_CHARS caracteres y exactamente
+    IDEAS_COUNT ideas de hasta IDEA_MAX_WORDS palabras que empiecen por infinitivo
+    (si sobran válidas, se queda con las primeras).
+    """
+    if not isinstance(data, dict):
+        return {}, ["la respuesta no es un objeto JSON"]
+    out, problems = {}, []
+    why = data.get("why_it_matters")
+    why = " ".join(why.split()) if isinstance(why, str) else ""
+    if not why:
+        problems.append("falta why_it_matters")
+    elif not WHY_MIN_CHARS <= len(why) <= WHY_MAX_CHARS:
+        problems.append(f"why_it_matters tiene {len(why)} caracteres (entre {WHY_MIN_CHARS} y {WHY_MAX_CHARS})")
+    else:
+        out["why_it_matters"] = why
+
+    ideas = data.get("activation_ideas")
+    ideas = [_IDEA_PREFIX_RX.sub("", str(x)).strip() for x in ideas if str(x).strip()] if isinstance(ideas, list) else []
+    good = [i for i in ideas if len(i.split()) <= IDEA_MAX_WORDS and _verb_first(i)]
+    if len(good) >= IDEAS_COUNT:
+        out["activation_ideas"] = good[:IDEAS_COUNT]
+    else:
+        bad = [i for i in ideas if i not in good]
+        problem = f"activation_ideas: hacen falta {IDEAS_COUNT} válidas y hay {len(good)}"
+        if bad:
+            problem += f" (no empiezan por infinitivo o pasan de {IDEA_MAX_WORDS} palabras: {bad[:3]})"
+        problems.append(problem)
+    return out, problems
+
+def _load_json(raw: str):
+    try:
+        return json.loads(_extract_json_block(raw))
+    except Exception:
+        return None
+
+def _valid_enrichment(raw: str) -> bool:
+    return not validate_enrichment(_load_json(raw))[1]
 
-{{
-  "why_it_matters": "texto breve en español",
-  "activation_ideas": ["frase 1", "frase 2", "frase 3"]
-}}
+def _repair_enrichment(raw: str, problems: list) -> dict:
+    """
+    Un único intento barato: se reenvía solo la respuesta (no la noticia) con lo que falla.
+    Devuelve lo que se pueda validar; si sigue incompleto, marca needs_enrichment
+    para que otra ejecución lo reintente.
+    """
+    run_metrics.incr("enrich.repair")
+    prompt = f"""
+Esta respuesta no cumple el formato pedido: {"; ".join(problems)}.
+Corrígela sin cambiar su sentido. Formato:
 
-Título: {title}
-Resumen: {summary}
-Categoría: {category}
-Enlace: {link}
+{_ENRICH_FIELDS_SPEC}
+
+Respuesta:
+{(raw or "").strip()[:2000]}
 """.strip()
+    fixed, still = validate_enrichment(_load_json(_generate_single_pass(prompt, schema=_ENRICH_SCHEMA,
+                                                                        accept=_valid_enrichment)))
+    if still:
+        print(f"[IA] Enriquecimiento incompleto tras reparar: {'; '.join(still)}", flush=True)
+        run_metrics.incr("enrich.failed")
+        return {**fixed, "needs_enrichment": True}
+    run_metrics.incr("enrich.repaired")
+    return fixed
+
+def _checked_enrichment(raw: str, data) -> dict:
+    fields, problems = validate_enrichment(data)
+    if not problems:
+        return fields
+    if not (raw or "").strip():
+        run_metrics.incr("enrich.failed")
+        return {"needs_enrichment": True}
+    repaired = _repair_enrichment(raw, problems)
+    # Lo que ya era válido en la primera respuesta no se pierde
+    return {**fields, **repaired}
 
-    try:
-        raw = _generate_single_pass(prompt)
-        if not raw:
-            return {}
+def enrich_article_fields(article: dict) -> dict:
+    """
+    {why_it_matters, activation_ideas} validados. Si ni con la reparación cumplen,
+    lo válido más {"needs_enrichment": True}. ResourceExhausted y GenerationError se propagan.
+    """
+
+    prompt = f"""
+{_ENRICH_INTRO}
 
-        block = _extract_json_block(raw)
-        data = json.loads(block)
+{_ENRICH_FIELDS_SPEC}
 
-        out = {}
-        w = data.get("why_it_matters")
-        if isinstance(w, str) and w.strip():
-            out["why_it_matters"] = w.strip()
+{article_block(article)}
+""".strip()
 
-        ideas = data.get("activation_ideas")
-        if isinstance(ideas, list):
-            cleaned = [str(x).strip() for x in ideas if str(x).strip()]
-            out["activation_ideas"] = cleaned[:5]
+    raw = _generate_single_pass(prompt, schema=_ENRICH_SCHEMA, accept=_valid_enrichment)
+    return _checked_enrichment(raw, _load_json(raw))
 
-        return out
-    except ResourceExhausted:
-        raise
-    except Exception as e:
-        print(f"[IA] Enrichment parse error: {e}")
-        return {}
+# ─────────────────────────────────────────────────────────────
+# Clasificación + enriquecimiento en una sola llamada
+# ─────────────────────────────────────────────────────────────
+def classify_and_enrich(article: dict) -> dict:
+    """
+    Una única llamada que devuelve {relevant, why_it_matters, activation_ideas}.
+    Los campos de enriquecimiento solo se exigen (y se devuelven) si relevant=true,
+    con la misma validación y reparación que enrich_article_fields.
+    Sin veredicto legible → GenerationError (vuelve a la cola; no es un "false").
+    """
+
+    prompt = f"""
+{_RELEVANCE_CRITERIA}
+
+Si es relevante, actúa como “Aura Host” y añade:
+
+{_ENRICH_FIELDS_SPEC}
+
+Si no es relevante, devuelve solo {{"relevant": false}}.
+
+{article_block(article)}
+""".strip()
+
+    raw = _generate_single_pass(prompt, schema=_COMBINED_SCHEMA, accept=_valid_combined)
+    data = _load_json(raw)
+    relevant = _coerce_verdict(data.get("relevant")) if isinstance(data, dict) else None
+    if relevant is None:
+        raise GenerationError(f"respuesta sin veredicto: {(raw or '')[:120]!r}")
+    if not relevant:
+        return {"relevant": False}
+    enrichment = {k: data[k] for k in ("why_it_matters", "activation_ideas") if k in data}
+    if not enrichment:
+        # Nada que reparar sin volver a mandar la noticia: queda para otra ejecución
+        run_metrics.incr("enrich.failed")
+        return {"relevant": True, "needs_enrichment": True}
+    return {"relevant": True, **_checked_enrichment(json.dumps(enrichment, ensure_ascii=False), enrichment)}
+
+def _valid_combined(raw: str) -> bool:
+    data = _load_json(raw)
+    relevant = _coerce_verdict(data.get("relevant")) if isinstance(data, dict) else None
+    if relevant is None:
+        return False
+    return not relevant or not validate_enrichment(data)[1]
+
+def apply_enrichment(article: dict, enrich: dict) -> bool:
+    """
+    Copia why_it_matters / activation_ideas válidos en `article`.
+    Completo → sello enrich_version; incompleto → needs_enrichment (+ enrich_attempts).
+    Devuelve True si el enriquecimiento quedó completo.
+    """
+    if enrich.get("why_it_matters"):
+        article["why_it_matters"] = enrich["why_it_matters"]
+    if enrich.get("activation_ideas"):
+        article["activation_ideas"] = enrich["activation_ideas"]
+    if enrich.get("needs_enrichment"):
+        article["needs_enrichment"] = True
+        article["enrich_attempts"] = int(article.get("enrich_attempts") or 0) + 1
+        return False
+    article.pop("needs_enrichment", None)
+    article.pop("enrich_attempts", None)
+    article["enrich_version"] = ENRICH_VERSION
+    return True
@@ -0,0 +1,61 @@
+from functools import lru_cache
+from bs4 import BeautifulSoup
+from app.utils import rerun_profile
+
+SNIPPET_CHARS = 280
+
+def extract_image_and_text(summary_html: str):
+    if not summary_html:
+        return None, ""
+    rerun_profile.count("parse.html")
+    try:
+        soup = BeautifulSoup(summary_html, "html.parser")
+        img_url = None
+        img_tag = soup.find("img")
+        if img_tag and img_tag.get("src"):
+            img_url = img_tag.get("src")
+        for tag in soup(["script", "style"]):
+            tag.extract()
+        text = soup.get_text(separator=" ", strip=True)
+        return img_url, text
+    except Exception:
+        return None, summary_html
+
+# Para entradas antiguas sin campos precalculados: cada summary se parsea una vez por proceso
+cached_extract_image_and_text = lru_cache(maxsize=4096)(extract_image_and_text)
+
+def clean_text_of(article: dict) -> str:
+    """Texto limpio del artículo: el precalculado o, en entradas antiguas, el extraído (memoizado)."""
+    clean = article.get("clean_text")
+    if clean is None:
+        _, clean = cached_extract_image_and_text(article.get("summary", "") or "")
+    return clean or ""
+
+def make_snippet(clean_text: str, max_chars: int = SNIPPET_CHARS) -> str:
+    return (clean_text[:max_chars] + "…") if len(clean_text) > max_chars else clean_text
+
+def card_fields(article: dict) -> dict:
+    """image_url / clean_text / snippet para la tarjeta, calculados desde `summary`."""
+    img_url, clean_text = extract_image_and_text(article.get("summary", ""))
+    return {
+        "image_url": img_url,
+        "clean_text": clean_text,
+        "snippet": make_snippet(clean_text),
+    }
+
+def add_card_fields(article: dict, force: bool = False) -> bool:
+    """Añade los campos de tarjeta si faltan. Devuelve True si ha cambiado algo."""
+    if not force and "snippet" in article:
+        return False
+    article.update(card_fields(article))
+    return True
+
+def render_fields(article: dict):
+    """
+    (image_url, snippet) para pintar la tarjeta: usa lo precalculado por el colector
+    y, si es una entrada antigua, el extractor memoizado.
+    """
+    if "snippet" in article:
+        return article.get("image_url"), article.get("snippet") or ""
+    img_url, clean_text = cached_extract_image_and_text(article.get("summary", "") or "")
+    return img_url, make_snippet(clean_text)
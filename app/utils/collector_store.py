@@ -0,0 +1,155 @@
+import os
+from app.utils.jsonio import read_json, atomic_write_json, append_jsonl, read_jsonl
+from app.utils.trend_shards import TrendShards, TRENDS_DIR, LEGACY_TRENDS_PATH, now_iso
+from app.utils.search_index import SearchIndex, SEARCH_INDEX_PATH
+
+DATA_DIR = "data"
+CURATED_PATH = os.path.join(DATA_DIR, "curated.json")
+JOURNAL_PATH = os.path.join(DATA_DIR, "collector_journal.jsonl")
+# Texto de las descartadas (para entrenar el prefiltro local); solo se añade
+REJECTED_PATH = os.path.join(DATA_DIR, "rejected.jsonl")
+_REJECTED_TEXT_CHARS = 2000
+
+def _normalize_curated(obj):
+    if isinstance(obj, dict):
+        return obj
+    if isinstance(obj, list):
+        out = {}
+        for item in obj:
+            if isinstance(item, str):
+                out[item] = False
+            elif isinstance(item, dict) and "id" in item:
+                val = item.get("relevante")
+                out[item["id"]] = bool(val) if isinstance(val, bool) else False
+        return out
+    return {}
+
+def _rejected_sample(article):
+    sample = {k: article.get(k) for k in ("id", "title", "category", "published", "decided_by", "relevance_version")
+              if article.get(k)}
+    sample["clean_text"] = (article.get("clean_text") or "")[:_REJECTED_TEXT_CHARS]
+    return sample
+
+def load_rejected(path=REJECTED_PATH):
+    return read_jsonl(path)
+
+class CollectorStore:
+    """
+    Persistencia del colector: instantáneas (curated.json, shards de data/trends/) + diario JSONL.
+    - record(): una línea al diario por artículo evaluado → coste constante,
+      independiente del tamaño del histórico.
+    - compact(): vuelca curated.json y los shards tocados (temporal + rename)
+      y vacía el diario. Se llama al final de la ejecución (y cada
+      `compact_every` registros si se configura).
+    - Las relevantes van al shard de su mes de recogida (`collected_at`); solo se
+      lee el shard que se toca, no todo el histórico (ver TrendShards).
+    - Cada relevante nueva entra también en el índice de búsqueda (data/search_index.json).
+    - Las descartadas dejan su texto en rejected.jsonl (append-only) para el prefiltro.
+    - Al abrir, se aplica el diario pendiente sobre las instantáneas: lo que
+      quedó a medias por un corte no se pierde.
+    """
+
+    def __init__(self, curated_path=CURATED_PATH, trends_dir=TRENDS_DIR,
+                 journal_path=JOURNAL_PATH, compact_every=0, rejected_path=REJECTED_PATH,
+                 legacy_trends_path=LEGACY_TRENDS_PATH, search_path=SEARCH_INDEX_PATH):
+        self.curated_path = curated_path
+        self.journal_path = journal_path
+        self.rejected_path = rejected_path
+        self.compact_every = compact_every
+        self.curated = _normalize_curated(read_json(curated_path, default={}))
+        self.shards = TrendShards(trends_dir, legacy_path=legacy_trends_path)
+        self.search = SearchIndex(search_path) if search_path else None
+        if self.search is not None and not len(self.search) and self.shards.count():
+            # Primera vez: se indexa todo el histórico (archivo incluido)
+            for a in self.shards.iter_items(include_archived=True):
+                self.search.add(a)
+            print(f"[🔎] Índice de búsqueda creado: {len(self.search)} artículos.", flush=True)
+            self.search.save()
+        self._pending = 0
+
+        replayed = read_jsonl(journal_path)
+        for rec in replayed:
+            self._apply(rec)
+        if replayed:
+            print(f"[💾] Diario recuperado: {len(replayed)} registros pendientes.", flush=True)
+            self.compact()
+
+    def _apply(self, rec):
+        art_id = rec.get("id")
+        if not art_id:
+            return
+        self.curated[art_id] = bool(rec.get("relevant"))
+        article = rec.get("article")
+        if isinstance(article, dict) and rec.get("remove"):
+            self.shards.remove(article)
+            if self.search is not None:
+                self.search.remove(art_id)
+        elif isinstance(article, dict) and rec.get("update"):
+            self.shards.update(article)
+            if self.search is not None:
+                self.search.replace(article)
+        elif isinstance(article, dict):
+            self.shards.add(article)
+            if self.search is not None:
+                self.search.add(article)
+
+    def __contains__(self, art_id):
+        return art_id in self.curated
+
+    def record(self, art_id, relevant, article=None):
+        """
+        Registra una decisión. Si es relevante, el artículo va a trends; si no,
+        su título y texto limpio se añaden a rejected.jsonl (datos de entrenamiento).
+        """
+        rec = {"id": art_id, "relevant": bool(relevant)}
+        if relevant and article is not None:
+            article.setdefault("collected_at", now_iso())
+            rec["article"] = article
+        elif article is not None:
+            append_jsonl(self.rejected_path, _rejected_sample(article))
+        self._journal(rec)
+
+    def update_trend(self, article):
+        """Reescribe una relevante ya guardada (p. ej. reenriquecida); pasa por el diario como record()."""
+        self._journal({"id": article.get("id"), "relevant": True, "article": article, "update": True})
+
+    def demote_trend(self, article):
+        """Una relevante que al reevaluarla ya no lo es: sale de trends y queda como descartada."""
+        append_jsonl(self.rejected_path, _rejected_sample(article))
+        self._journal({"id": article.get("id"), "relevant": False, "remove": True,
+                       "article": {k: article.get(k) for k in ("id", "collected_at", "published") if article.get(k)}})
+
+    def _journal(self, rec):
+        append_jsonl(self.journal_path, rec)
+        self._apply(rec)
+        self._pending += 1
+        if self.compact_every and self._pending >= self.compact_every:
+            self.compact()
+
+    def needs_enrichment(self, months=2) -> list:
+        """Relevantes marcadas con needs_enrichment en los `months` shards más recientes."""
+        out = []
+        for month in self.shards.months()[:months]:
+            out.extend(a for a in self.shards.load(month) if a.get("needs_enrichment"))
+        return out
+
+    def compact(self):
+        atomic_write_json(self.curated_path, self.curated)
+        self.shards.flush()
+        if self.search is not None:
+            self.search.save()
+        # Solo vaciamos el diario cuando las instantáneas ya están en disco;
+        # si algo falla antes, reaplicarlo es idempotente.
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._pending = 0
+
+    def trend_count(self) -> int:
+        return self.shards.count()
+
+    def all_trends(self, include_archived=False) -> list:
+        """Todas las relevantes (lee todos los shards: para scripts de mantenimiento)."""
+        return list(self.shards.iter_items(include_archived=include_archived))
+
+    def apply_retention(self, keep_ids=()) -> int:
+        return self.shards.apply_retention(keep_ids)
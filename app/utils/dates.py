@@ -0,0 +1,9 @@
+from email.utils import parsedate_to_datetime
+
+def published_ts(article: dict) -> float:
+    """Epoch del `published` (RFC 822 en los feeds); 0 si no se puede leer."""
+    raw = article.get("published") or ""
+    try:
+        return parsedate_to_datetime(raw).timestamp()
+    except Exception:
+        return 0.0
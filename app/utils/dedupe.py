@@ -0,0 +1,116 @@
+import os
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from app.utils.card_fields import clean_text_of
+from app.utils.jsonio import read_json, atomic_write_json
+from app.utils.textnorm import tokenize
+
+DEDUPE_PATH = os.path.join("data", "dedupe_index.json")
+
+# Distancia de Hamming máxima (sobre 64 bits) para considerar dos historias la misma
+SIMHASH_MAX_DISTANCE = 3
+# Con menos tokens la huella no es fiable (solo se compara la URL)
+SIMHASH_MIN_TOKENS = 8
+_BANDS = SIMHASH_MAX_DISTANCE + 1  # por el principio del palomar, dos huellas a distancia ≤3 comparten una banda
+_BAND_BITS = 64 // _BANDS
+
+# ─────────────────────────────────────────────────────────────
+# URL canónica
+# ─────────────────────────────────────────────────────────────
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "mbid", "cmpid",
+    "ref", "ref_src", "igshid", "_hsenc", "_hsmi", "ncid", "soc_src", "soc_trk",
+}
+
+def canonical_url(url: str) -> str:
+    """Sin esquema ni www., sin fragmento, sin parámetros de tracking (utm_*, fbclid…), sin barra final."""
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("", host, path, urlencode(sorted(query)), "")).lstrip("/")
+
+# ─────────────────────────────────────────────────────────────
+# SimHash (64 bits) sobre título + texto limpio, por trigramas de palabras
+# ─────────────────────────────────────────────────────────────
+def simhash(article: dict):
+    tokens = tokenize(f"{article.get('title', '')} {clean_text_of(article)}")
+    if len(tokens) < SIMHASH_MIN_TOKENS:
+        return None
+    shingles = {" ".join(tokens[i:i + 3]) for i in range(len(tokens) - 2)}
+    acc = [0] * 64
+    for sh in shingles:
+        h = int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            acc[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if acc[bit] > 0)
+
+def _bands(h: int):
+    mask = (1 << _BAND_BITS) - 1
+    return [f"{b}:{(h >> (b * _BAND_BITS)) & mask:x}" for b in range(_BANDS)]
+
+class DedupeIndex:
+    """
+    Índice de historias ya vistas: URL canónica → id y SimHash → id.
+    find() devuelve el id de la historia original si el artículo es un (casi) duplicado.
+    Persistido en data/dedupe_index.json para que los duplicados de otros días
+    hereden la decisión y el enriquecimiento sin gastar llamadas.
+    """
+
+    def __init__(self, path: str = DEDUPE_PATH):
+        self.path = path
+        self.urls = {}
+        self.hashes = {}
+        self._buckets = {}
+        if path:
+            data = read_json(path, default={})
+            if isinstance(data, dict):
+                self.urls = dict(data.get("urls") or {})
+                for art_id, hx in (data.get("hashes") or {}).items():
+                    self._add_hash(art_id, int(hx, 16))
+
+    def __len__(self):
+        return len(self.hashes) + len(self.urls)
+
+    def _add_hash(self, art_id: str, h: int):
+        self.hashes[art_id] = h
+        for band in _bands(h):
+            self._buckets.setdefault(band, []).append(art_id)
+
+    def find(self, article: dict):
+        url = canonical_url(article.get("link", ""))
+        if url and self.urls.get(url) not in (None, article.get("id")):
+            return self.urls[url]
+        h = simhash(article)
+        if h is None:
+            return None
+        for band in _bands(h):
+            for other in self._buckets.get(band, ()):
+                if other != article.get("id") and bin(h ^ self.hashes[other]).count("1") <= SIMHASH_MAX_DISTANCE:
+                    return other
+        return None
+
+    def add(self, article: dict, canonical_id: str = None):
+        """Registra el artículo (como original, o apuntando a `canonical_id` si es duplicado)."""
+        target = canonical_id or article.get("id")
+        url = canonical_url(article.get("link", ""))
+        if url:
+            self.urls.setdefault(url, target)
+        if canonical_id is None:
+            h = simhash(article)
+            if h is not None and target not in self.hashes:
+                self._add_hash(target, h)
+
+    def save(self):
+        atomic_write_json(self.path, {
+            "urls": self.urls,
+            "hashes": {k: f"{v:016x}" for k, v in self.hashes.items()},
+        }, indent=None)
@@ -0,0 +1,92 @@
+import os
+import gzip
+import json
+import tempfile
+from app.utils import rerun_profile
+
+def read_json(path, default):
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                rerun_profile.count("files.read_json")
+                return json.load(f)
+    except Exception as e:
+        print(f"[!] No pude leer {path}: {e} → reinicio formato.", flush=True)
+    return default
+
+def atomic_write_json(path, data, indent=2):
+    """
+    Escribe en un temporal del mismo directorio y lo renombra encima del destino:
+    quien lea el fichero (p. ej. el dashboard) ve la versión anterior o la nueva, nunca media.
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def atomic_write_json_gz(path, data, level=6):
+    """Como atomic_write_json, pero JSON compacto y comprimido con gzip (sin fecha en la cabecera)."""
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json.gz", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(raw, compresslevel=level, mtime=0))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return len(raw)
+
+def read_json_gz(path, default):
+    try:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                rerun_profile.count("files.read_json_gz")
+                return json.loads(gzip.decompress(f.read()))
+    except Exception as e:
+        print(f"[!] No pude leer {path}: {e}", flush=True)
+    return default
+
+def append_jsonl(path, record):
+    """Añade una línea JSON (una sola escritura + fsync)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_jsonl(path):
+    """Lee un JSONL ignorando líneas corruptas (p. ej. la última tras un corte)."""
+    out = []
+    if not os.path.exists(path):
+        return out
+    rerun_profile.count("files.read_jsonl")
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue
+    return out
@@ -0,0 +1,108 @@
+import os
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from app.utils.jsonio import read_json, atomic_write_json
+
+try:
+    from zoneinfo import ZoneInfo
+    _QUOTA_TZ = ZoneInfo("America/Los_Angeles")  # la cuota diaria de Gemini se reinicia a medianoche (hora del Pacífico)
+except Exception:
+    _QUOTA_TZ = timezone.utc
+
+DATA_DIR = "data"
+LEDGER_PATH = os.path.join(DATA_DIR, "key_health.json")
+
+def key_fingerprint(key: str) -> str:
+    # Nunca guardamos la clave en claro: el fichero se commitea con los datos
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _parse_iso(s):
+    try:
+        return datetime.strptime(s, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    except Exception:
+        return None
+
+def _quota_day(dt: datetime) -> str:
+    return dt.astimezone(_QUOTA_TZ).date().isoformat()
+
+def next_quota_reset(dt: datetime) -> datetime:
+    local = dt.astimezone(_QUOTA_TZ)
+    midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time(), tzinfo=_QUOTA_TZ)
+    return midnight.astimezone(timezone.utc)
+
+class KeyLedger:
+    """
+    Estado de salud de cada clave entre ejecuciones (data/key_health.json):
+    {fingerprint: {"exhausted_until", "invalid", "last_429", "day", "calls_today"}}
+    - Una clave con 429 PerDay queda fuera hasta el siguiente reinicio de cuota.
+    - Una clave inválida/expirada queda fuera siempre (otra clave = otra huella).
+    Seguro entre hilos; cada cambio se escribe de forma atómica.
+    """
+
+    def __init__(self, path: str = LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self) -> dict:
+        data = read_json(self.path, default={})
+        return data if isinstance(data, dict) else {}
+
+    def _save(self):
+        atomic_write_json(self.path, self._data)
+
+    def _entry(self, key: str, now: datetime) -> dict:
+        entry = self._data.setdefault(key_fingerprint(key), {})
+        today = _quota_day(now)
+        if entry.get("day") != today:
+            entry["day"] = today
+            entry["calls_today"] = 0
+        return entry
+
+    def dead_reason(self, key: str):
+        """'invalid' | 'day' | None según lo que sepamos de ejecuciones anteriores."""
+        with self._lock:
+            entry = self._data.get(key_fingerprint(key)) or {}
+            if entry.get("invalid"):
+                return "invalid"
+            until = _parse_iso(entry.get("exhausted_until") or "")
+            if until and until > _now():
+                return "day"
+            return None
+
+    def calls_today(self, key: str) -> int:
+        with self._lock:
+            entry = self._data.get(key_fingerprint(key)) or {}
+            return int(entry.get("calls_today", 0)) if entry.get("day") == _quota_day(_now()) else 0
+
+    def record_call(self, key: str):
+        with self._lock:
+            entry = self._entry(key, _now())
+            entry["calls_today"] = int(entry.get("calls_today", 0)) + 1
+            self._save()
+
+    def record_429(self, key: str):
+        with self._lock:
+            now = _now()
+            self._entry(key, now)["last_429"] = _iso(now)
+            self._save()
+
+    def mark_exhausted(self, key: str):
+        with self._lock:
+            now = _now()
+            entry = self._entry(key, now)
+            entry["last_429"] = _iso(now)
+            entry["exhausted_until"] = _iso(next_quota_reset(now))
+            self._save()
+
+    def mark_invalid(self, key: str):
+        with self._lock:
+            self._entry(key, _now())["invalid"] = True
+            self._save()
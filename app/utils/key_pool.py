@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from app.utils import run_metrics
+
+# ─────────────────────────────────────────────────────────────
+# Ritmo por clave (lee las variables del workflow)
+# ─────────────────────────────────────────────────────────────
+def seconds_per_call() -> float:
+    """
+    Intervalo mínimo entre llamadas de una misma clave.
+    GEMINI_RPM_PER_KEY (si está) manda sobre GEMINI_SECONDS_PER_CALL; por defecto 12s (5 rpm).
+    """
+    rpm = os.getenv("GEMINI_RPM_PER_KEY", "").strip()
+    if rpm:
+        try:
+            value = float(rpm)
+            if value > 0:
+                return 60.0 / value
+        except ValueError:
+            pass
+    try:
+        return max(0.0, float(os.getenv("GEMINI_SECONDS_PER_CALL", "12")))
+    except ValueError:
+        return 12.0
+
+def rate_headroom() -> float:
+    """
+    Margen sobre el intervalo (GEMINI_RATE_HEADROOM, 10% por defecto): ir justo al
+    límite hace que la latencia/jitter meta la 6ª llamada en la misma ventana de 60s.
+    """
+    try:
+        return max(0.0, float(os.getenv("GEMINI_RATE_HEADROOM", "0.1")))
+    except ValueError:
+        return 0.1
+
+def requests_per_day() -> int:
+    """Cuota diaria por clave (GEMINI_RPD_PER_KEY, 1500 por defecto en el nivel gratuito de flash)."""
+    try:
+        return max(0, int(float(os.getenv("GEMINI_RPD_PER_KEY", "1500"))))
+    except ValueError:
+        return 1500
+
+class TokenBucket:
+    """
+    Cubo de tokens de una clave: `rate` tokens/s, como mucho `capacity` acumulados.
+    Con capacity=1 las llamadas quedan espaciadas 1/rate s, así que ninguna
+    ventana de un minuto supera el rpm configurado.
+    `blocked_until` congela la clave (retry_delay de un 429 por minuto).
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.rate <= 0:
+            self.tokens = self.capacity
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now, 0.0)
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def block(self, seconds: float, now: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+class KeyPool:
+    """
+    Reparte llamadas entre claves según la capacidad de cada una.
+    - acquire(): bloquea hasta que alguna clave viva tenga token y la devuelve
+      (None si no queda ninguna usable).
+    - cooldown(): aplica el retry_delay de un 429 solo a esa clave.
+    - mark_dead(): la clave no se vuelve a usar en esta ejecución (429 PerDay, inválida).
+    Con `ledger` (KeyLedger), las claves muertas de ejecuciones anteriores ni se
+    intentan, y las que mueren ahora quedan registradas para las siguientes.
+    Seguro entre hilos.
+    """
+
+    def __init__(self, keys, interval: float = None, ledger=None):
+        interval = (seconds_per_call() if interval is None else interval) * (1.0 + rate_headroom())
+        rate = (1.0 / interval) if interval > 0 else 0.0
+        self.keys = list(keys)
+        self.ledger = ledger
+        self._buckets = {k: TokenBucket(rate) for k in self.keys}
+        self._dead = {}
+        self._lock = threading.Lock()
+        if ledger is not None:
+            for idx, k in enumerate(self.keys, start=1):
+                reason = ledger.dead_reason(k)
+                if reason:
+                    print(f"🩺 Key #{idx} descartada por el ledger ({reason}).", flush=True)
+                    self._dead[k] = reason
+
+    @property
+    def interval(self) -> float:
+        """Segundos entre llamadas de una clave (ya con el margen)."""
+        rate = self._buckets[self.keys[0]].rate if self.keys else 0.0
+        return (1.0 / rate) if rate > 0 else 0.0
+
+    def live_keys(self):
+        with self._lock:
+            return [k for k in self.keys if k not in self._dead]
+
+    def acquire(self, exclude=()):
+        # Espera separada en ritmo (cubo vacío) y backoff (clave congelada por un 429)
+        waited = {"gemini.wait_pace": 0.0, "gemini.wait_backoff": 0.0}
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                candidates = [k for k in self.keys if k not in self._dead and k not in exclude]
+                if not candidates:
+                    return None
+                waits = {k: self._buckets[k].wait_time(now) for k in candidates}
+                key = min(candidates, key=waits.get)
+                if waits[key] <= 0:
+                    self._buckets[key].consume(now)
+                    break
+                wait = waits[key]
+                reason = "gemini.wait_backoff" if self._buckets[key].blocked_until > now else "gemini.wait_pace"
+            # Dormimos fuera del lock para no frenar a los demás hilos
+            slept = min(wait, 1.0)
+            time.sleep(slept)
+            waited[reason] += slept
+        for name, seconds in waited.items():
+            run_metrics.observe(name, seconds, key=key)
+        return key
+
+    def cooldown(self, key: str, seconds: float):
+        with self._lock:
+            self._buckets[key].block(seconds, time.monotonic())
+
+    def mark_dead(self, key: str, reason: str = ""):
+        with self._lock:
+            self._dead[key] = reason
+        if self.ledger is not None:
+            if reason == "invalid":
+                self.ledger.mark_invalid(key)
+            elif reason == "day":
+                self.ledger.mark_exhausted(key)
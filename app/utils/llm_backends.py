@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import time
+import zlib
+import atexit
+import random
+import threading
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+
+# ─────────────────────────────────────────────────────────────
+# Backends de LLM: Gemini real o un doble local para pruebas/benchmarks
+# ─────────────────────────────────────────────────────────────
+# Interfaz: backend.generate(key, model_name, prompt, schema=None) -> (texto, {"prompt_tokens", "output_tokens"})
+# Con `schema` se pide la respuesta en modo JSON contra ese esquema (response_schema).
+# Los errores se lanzan como los de Gemini (ResourceExhausted con retry_delay,
+# ServiceUnavailable, "API key expired"…) para que ai_filter los trate igual.
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self._check_client_attr()
+
+    @staticmethod
+    def _check_client_attr():
+        """
+        _model_for_key depende del atributo privado GenerativeModel._client (versión
+        acotada en requirements.txt). Si desaparece, generate_content volvería al cliente
+        global de genai.configure() y todas las claves compartirían ritmo: mejor parar aquí.
+        """
+        import google.generativeai as genai
+        if "_client" not in vars(genai.GenerativeModel("gemini-1.5-flash")):
+            raise RuntimeError("google-generativeai sin GenerativeModel._client: no hay cliente por clave "
+                               "(revisa la versión fijada en requirements.txt)")
+
+    def _model_for_key(self, key: str, model_name: str):
+        """
+        Un modelo por clave con su propio cliente: genai.configure() es global y
+        no sirve cuando varios hilos usan claves distintas a la vez.
+        Se sustituye el `_client` privado (comprobado en __init__).
+        """
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        with self._lock:
+            model = self._models.get((key, model_name))
+            if model is None:
+                model = genai.GenerativeModel(model_name)
+                model._client = glm.GenerativeServiceClient(client_options={"api_key": key})
+                self._models[(key, model_name)] = model
+            return model
+
+    def generate(self, key: str, model_name: str, prompt: str, schema: dict = None):
+        config = None
+        if schema is not None:
+            config = {"response_mime_type": "application/json", "response_schema": schema}
+        resp = self._model_for_key(key, model_name).generate_content(prompt, generation_config=config)
+        meta = getattr(resp, "usage_metadata", None)
+        usage = {
+            "prompt_tokens": int(getattr(meta, "prompt_token_count", 0) or 0),
+            "output_tokens": int(getattr(meta, "candidates_token_count", 0) or 0),
+        }
+        return (resp.text or "").strip(), usage
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+_BATCH_ID_RX = re.compile(r"^\[\d+\] id: (.+)$", re.MULTILINE)
+_TITLE_RX = re.compile(r"^Título: (.*)$", re.MULTILINE)
+
+class FakeBackend:
+    """
+    Doble local de Gemini (AURA_LLM_BACKEND=fake). Configurable por entorno:
+    - AURA_FAKE_LATENCY      segundos por llamada (0.05)
+    - AURA_FAKE_RPM          llamadas por clave y ventana (5); AURA_FAKE_WINDOW ventana en s (60)
+    - AURA_FAKE_RPD          llamadas por clave y día (1500)
+    - AURA_FAKE_503_RATE     probabilidad de 503 (0)
+    - AURA_FAKE_INVALID_KEYS claves que responden "API key expired" (lista por comas)
+    - AURA_FAKE_RELEVANT     fracción de noticias relevantes (0.4), determinista por id/título
+    - AURA_FAKE_BAD_ENRICH_RATE probabilidad de un enriquecimiento fuera de formato (0);
+                             las reparaciones siempre salen bien
+    - AURA_FAKE_STATS        si se indica, vuelca contadores JSON ahí al salir
+    Entiende los prompts de ai_filter (uno, lote, enriquecimiento, combinado).
+    """
+    name = "fake"
+
+    def __init__(self):
+        self.latency = _env_float("AURA_FAKE_LATENCY", 0.05)
+        self.rpm = int(_env_float("AURA_FAKE_RPM", 5))
+        self.window = _env_float("AURA_FAKE_WINDOW", 60)
+        self.rpd = int(_env_float("AURA_FAKE_RPD", 1500))
+        self.rate_503 = _env_float("AURA_FAKE_503_RATE", 0.0)
+        self.relevant = _env_float("AURA_FAKE_RELEVANT", 0.4)
+        self.bad_enrich = _env_float("AURA_FAKE_BAD_ENRICH_RATE", 0.0)
+        self.invalid = {k.strip() for k in os.getenv("AURA_FAKE_INVALID_KEYS", "").split(",") if k.strip()}
+        self._rng = random.Random(int(_env_float("AURA_FAKE_SEED", 7)))
+        self._lock = threading.Lock()
+        self._recent = {}
+        self._daily = {}
+        self.stats = {"calls": 0, "ok": 0, "429_minute": 0, "429_day": 0, "503": 0,
+                      "invalid": 0, "latency_s": 0.0, "tokens_in": 0, "tokens_out": 0, "by_key": {}}
+        stats_path = os.getenv("AURA_FAKE_STATS", "").strip()
+        if stats_path:
+            atexit.register(self._dump_stats, stats_path)
+
+    def _dump_stats(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.stats, f, indent=2)
+
+    def _is_relevant(self, token: str) -> bool:
+        return zlib.crc32(token.encode("utf-8")) % 1000 < self.relevant * 1000
+
+    def _admit(self, key: str):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["by_key"][key[-4:]] = self.stats["by_key"].get(key[-4:], 0) + 1
+            if key in self.invalid:
+                self.stats["invalid"] += 1
+                raise ValueError("400 API key expired. Please renew the API key. [reason: \"API_KEY_INVALID\"]")
+            if self._daily.get(key, 0) >= self.rpd:
+                self.stats["429_day"] += 1
+                raise ResourceExhausted(
+                    '429 You exceeded your current quota. violations { quota_metric: '
+                    '"generativelanguage.googleapis.com/generate_content_free_tier_requests" '
+                    'quota_id: "GenerateRequestsPerDayPerProjectPerModel-FreeTier" }')
+            now = time.monotonic()
+            recent = [t for t in self._recent.get(key, []) if now - t < self.window]
+            if len(recent) >= self.rpm:
+                self.stats["429_minute"] += 1
+                retry = max(1, int(self.window - (now - recent[0])) + 1)
+                self._recent[key] = recent
+                raise ResourceExhausted(
+                    '429 You exceeded your current quota. violations { quota_metric: '
+                    '"generativelanguage.googleapis.com/generate_content_free_tier_requests" '
+                    'quota_id: "GenerateRequestsPerMinutePerProjectPerModel-FreeTier" } '
+                    f'retry_delay {{ seconds: {retry} }}')
+            recent.append(now)
+            self._recent[key] = recent
+            self._daily[key] = self._daily.get(key, 0) + 1
+            if self._rng.random() < self.rate_503:
+                self.stats["503"] += 1
+                raise ServiceUnavailable("503 The model is overloaded. Please try again later.")
+
+    def _answer(self, prompt: str) -> str:
+        ids = _BATCH_ID_RX.findall(prompt)
+        if ids:
+            return json.dumps({i.strip(): self._is_relevant(i.strip()) for i in ids})
+        m = _TITLE_RX.search(prompt)
+        title = m.group(1) if m else prompt[-200:]
+        enrichment = {
+            "why_it_matters": f"Tendencia útil para conversar con huéspedes: {title[:120]}.",
+            "activation_ideas": ["Recomendar la experiencia en recepción.",
+                                 "Sugerir una visita relacionada en Málaga.",
+                                 "Invitar a comentarla durante el desayuno."],
+        }
+        if '"why_it_matters"' in prompt and "no cumple el formato" not in prompt:
+            with self._lock:
+                bad = self._rng.random() < self.bad_enrich
+            if bad:
+                enrichment = {"why_it_matters": enrichment["why_it_matters"],
+                              "activation_ideas": ["Experiencia gastronómica en la terraza del hotel."]}
+        if '"relevant": false' in prompt:
+            rel = self._is_relevant(title)
+            return json.dumps({"relevant": True, **enrichment} if rel else {"relevant": False}, ensure_ascii=False)
+        if '"why_it_matters"' in prompt:
+            return json.dumps(enrichment, ensure_ascii=False)
+        return "true" if self._is_relevant(title) else "false"
+
+    def generate(self, key: str, model_name: str, prompt: str, schema: dict = None):
+        self._admit(key)
+        if self.latency > 0:
+            time.sleep(self.latency)
+        text = self._answer(prompt)
+        # Como Gemini: ~4 caracteres por token
+        usage = {"prompt_tokens": (len(prompt) + 3) // 4, "output_tokens": (len(text) + 3) // 4}
+        with self._lock:
+            self.stats["ok"] += 1
+            self.stats["latency_s"] += self.latency
+            self.stats["tokens_in"] += usage["prompt_tokens"]
+            self.stats["tokens_out"] += usage["output_tokens"]
+        return text, usage
+
+def get_backend():
+    name = os.getenv("AURA_LLM_BACKEND", "gemini").strip().lower()
+    if name == "fake":
+        print("🧪 LLM backend: fake (sin red)", flush=True)
+        return FakeBackend()
+    return GeminiBackend()
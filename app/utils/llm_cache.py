@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from app.utils.jsonio import atomic_write_json
+
+CACHE_DIR = os.getenv("GEMINI_CACHE_DIR", os.path.join("data", "llm_cache"))
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+class ResponseCache:
+    """
+    Caché en disco de respuestas de Gemini, direccionada por contenido:
+    sha256(modelo + prompt) → data/llm_cache/ab/abcd….json
+    - TTL: una entrada más vieja que `ttl_seconds` no cuenta como acierto.
+    - Tamaño acotado: si el directorio pasa de `max_bytes`, se borran las menos
+      usadas recientemente (el mtime se refresca en cada acierto).
+    - bypass: no se lee (sí se escribe), para forzar respuestas nuevas.
+    - discard: quita una entrada concreta (respuesta que el llamante ha rechazado).
+    Seguro entre hilos.
+    """
+
+    def __init__(self, folder=CACHE_DIR, ttl_seconds=None, max_bytes=None, bypass=None):
+        self.folder = folder
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_float("GEMINI_CACHE_TTL_DAYS", 30) * 86400
+        self.max_bytes = max_bytes if max_bytes is not None else int(_env_float("GEMINI_CACHE_MAX_MB", 50) * 1024 * 1024)
+        if bypass is None:
+            bypass = os.getenv("GEMINI_CACHE_BYPASS", "").strip().lower() in ("1", "true", "yes")
+        self.bypass = bypass
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0, "discards": 0}
+        self._lock = threading.Lock()
+        self._bytes = None  # se calcula en la primera escritura
+
+    @staticmethod
+    def key(model: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.folder, digest[:2], f"{digest}.json")
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, model: str, prompt: str):
+        if self.bypass:
+            self._count("misses")
+            return None
+        path = self._path(self.key(model, prompt))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        if time.time() - float(entry.get("created_at", 0)) > self.ttl_seconds:
+            self._count("expired")
+            self._count("misses")
+            return None
+        try:
+            os.utime(path)  # LRU: marca de uso reciente
+        except OSError:
+            pass
+        self._count("hits")
+        return entry.get("text")
+
+    def put(self, model: str, prompt: str, text: str):
+        if not text:
+            return
+        path = self._path(self.key(model, prompt))
+        atomic_write_json(path, {"model": model, "created_at": time.time(), "text": text}, indent=None)
+        self._count("writes")
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_size()
+            else:
+                try:
+                    self._bytes += os.path.getsize(path)
+                except OSError:
+                    pass
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def discard(self, model: str, prompt: str) -> bool:
+        """Borra la entrada de (model, prompt): la siguiente consulta es un fallo. True si existía."""
+        path = self._path(self.key(model, prompt))
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return False
+        self._count("discards")
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes = max(0, self._bytes - size)
+        return True
+
+    def _entries(self):
+        out = []
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                if not name.endswith(".json") or name.startswith(".tmp-"):
+                    continue  # los temporales de otra escritura en curso no se tocan
+                p = os.path.join(root, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Bajamos al 90% del máximo, empezando por lo menos usado
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(p)
+                total -= size
+                self.stats["evictions"] += 1
+            except OSError:
+                pass
+        self._bytes = total
+
+    def summary(self) -> str:
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = (100.0 * s["hits"] / lookups) if lookups else 0.0
+        return (f"caché Gemini: {s['hits']} aciertos / {s['misses']} fallos ({rate:.0f}%), "
+                f"{s['writes']} escrituras, {s['evictions']} expulsadas, {s['discards']} descartadas" + (" [bypass]" if self.bypass else ""))
@@ -1,6 +1,23 @@
+import os
+import time
+import calendar
 import yaml
 import feedparser
 import hashlib
+import requests
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app.utils.jsonio import read_json, atomic_write_json
+from app.utils import run_metrics
+
+# Descarga concurrente (ajustable por entorno)
+FEED_MAX_WORKERS = int(os.getenv("FEED_MAX_WORKERS", "8"))
+FEED_CONNECT_TIMEOUT = float(os.getenv("FEED_CONNECT_TIMEOUT", "5"))
+FEED_READ_TIMEOUT = float(os.getenv("FEED_READ_TIMEOUT", "20"))
+_HEADERS = {"User-Agent": "aura-trends-collector (+feedparser)"}
+
+FEED_STATE_PATH = os.path.join("data", "feed_state.json")
 
 def _make_id(title, link, published):
     base = f"{link or ''}|{title or ''}|{published or ''}"
@@ -23,22 +40,134 @@ def load_feeds(path="config/feeds.yaml"):
         print(f"[❌] Error leyendo {path}: {e}")
         return {}
 
-def fetch_articles_from_feeds(feeds_by_category, per_category=60):
+# ─────────────────────────────────────────────────────────────
+# Estado por feed: GET condicional (ETag/Last-Modified) y marca de agua
+# ─────────────────────────────────────────────────────────────
+def load_feed_state(path=FEED_STATE_PATH):
+    """{url: {"etag", "last_modified", "watermark"}}; watermark = epoch UTC del
+    `published` más reciente ya entregado al colector."""
+    data = read_json(path, default={})
+    return data if isinstance(data, dict) else {}
+
+def save_feed_state(state, path=FEED_STATE_PATH):
+    atomic_write_json(path, state)
+
+def _entry_timestamp(entry):
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    if not parsed:
+        return None
+    try:
+        return float(calendar.timegm(parsed))
+    except Exception:
+        return None
+
+def _download_feed(url, prev=None):
+    """
+    GET (condicional si conocemos ETag/Last-Modified).
+    Devuelve (content|None, headers, validators); content=None → 304, nada nuevo.
+    """
+    if url.startswith("file://"):
+        # Feeds locales (fixtures de pruebas y benchmark): sin red ni GET condicional
+        with open(url2pathname(urlsplit(url).path), "rb") as f:
+            return f.read(), {}, {}
+    headers = dict(_HEADERS)
+    prev = prev or {}
+    if prev.get("etag"):
+        headers["If-None-Match"] = prev["etag"]
+    if prev.get("last_modified"):
+        headers["If-Modified-Since"] = prev["last_modified"]
+    with run_metrics.timer("feeds.download"):
+        resp = requests.get(url, headers=headers, timeout=(FEED_CONNECT_TIMEOUT, FEED_READ_TIMEOUT))
+    if resp.status_code == 304:
+        return None, {}, {}
+    resp.raise_for_status()
+    validators = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+    }
+    return resp.content, dict(resp.headers), validators
+
+def _fetch_feeds_concurrently(urls, state=None):
+    """
+    Descarga todas las URLs en un pool acotado (timeouts de conexión/lectura por feed)
+    y parsea cada una según llega. Un feed lento o caído no frena al resto:
+    se registra el error y queda como feed vacío. Un 304 no se parsea.
+    Devuelve ({url: feed|None}, {url: validadores nuevos}); los validadores (ETag/Last-Modified)
+    no se guardan aquí: solo cuando el feed se entrega entero (ver fetch_articles_from_feeds).
+    """
+    parsed, fresh = {}, {}
+    if not urls:
+        return parsed, fresh
+    state = state if state is not None else {}
+    workers = max(1, min(FEED_MAX_WORKERS, len(urls)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_download_feed, url, state.get(url)): url for url in urls}
+        for fut in as_completed(futures):
+            url = futures[fut]
+            try:
+                content, headers, validators = fut.result()
+            except Exception as e:
+                print(f"[!] Feed no disponible {url}: {e}", flush=True)
+                run_metrics.incr("feeds.error")
+                parsed[url] = None
+                continue
+            if content is None:
+                print(f"[·] Sin cambios (304): {url}", flush=True)
+                run_metrics.incr("feeds.not_modified")
+                parsed[url] = None
+                continue
+            fresh[url] = validators
+            run_metrics.incr("feeds.ok")
+            run_metrics.incr("feeds.bytes", len(content))
+            with run_metrics.timer("feeds.parse"):
+                parsed[url] = feedparser.parse(content, response_headers=headers)
+    return parsed, fresh
+
+def fetch_articles_from_feeds(feeds_by_category, per_category=60, state=None, known=None):
+    """
+    Artículos de todos los feeds, en el orden de feeds.yaml y con tope por categoría.
+    Con `state` (ver load_feed_state) se hacen GET condicionales y se descartan
+    las entradas más antiguas que la marca de agua del feed; `state` se actualiza
+    en memoria y el llamante decide cuándo persistirlo (save_feed_state).
+    Lo que deja fuera el tope por categoría no se pierde: ETag/Last-Modified solo se
+    guardan si el feed se entregó entero, y la marca de agua nunca pasa de la entrada
+    no entregada más antigua. `known(id)` → True para ids ya evaluados o en cola:
+    se saltan sin ocupar hueco del tope (si no, un feed de más nuevo a más antiguo
+    volvería a llenar el tope con lo mismo en cada ejecución).
+    """
+    feeds_by_category = feeds_by_category or {}
+    unique_urls = list(dict.fromkeys(u for urls in feeds_by_category.values() for u in (urls or [])))
+    state = state if state is not None else {}
+    feeds, fresh_validators = _fetch_feeds_concurrently(unique_urls, state)
+
+    # Montamos los artículos en el orden de feeds.yaml, con el tope por categoría
     all_articles = []
-    for category, urls in (feeds_by_category or {}).items():
+    newest = {}        # url → published más reciente entregado
+    held_back = {}     # url → published más antiguo que el tope dejó fuera (inf si ninguna tenía fecha)
+    for category, urls in feeds_by_category.items():
         collected = 0
-        for url in urls:
-            if collected >= per_category:
-                break
-            feed = feedparser.parse(url)
+        for url in urls or []:
+            feed = feeds.get(url)
+            watermark = (state.get(url) or {}).get("watermark")
             for entry in getattr(feed, "entries", []):
-                if collected >= per_category:
-                    break
+                ts = _entry_timestamp(entry)
+                if ts is not None and watermark is not None and ts < watermark:
+                    run_metrics.incr("feeds.below_watermark")
+                    continue
                 title = entry.get("title", "")
                 link = entry.get("link", "")
                 published = entry.get("published", "")
-                summary = entry.get("summary", "")
                 art_id = entry.get("id") or _make_id(title, link, published)
+                if known is not None and known(art_id):
+                    run_metrics.incr("feeds.known")
+                    if ts is not None:
+                        newest[url] = max(newest.get(url, ts), ts)
+                    continue
+                if collected >= per_category:
+                    # Las entradas sin fecha no las filtra la marca de agua: solo cuentan para los validadores
+                    held_back[url] = min(held_back.get(url, float("inf")), ts if ts is not None else float("inf"))
+                    continue
+                summary = entry.get("summary", "")
                 all_articles.append({
                     "id": art_id,
                     "title": title,
@@ -48,4 +177,26 @@ def fetch_articles_from_feeds(feeds_by_category, per_category=60):
                     "category": category,
                 })
                 collected += 1
+                if ts is not None:
+                    newest[url] = max(newest.get(url, ts), ts)
+
+    # Validadores nuevos solo para los feeds entregados enteros: con un 304 mañana
+    # no volveríamos a ver lo que hoy se quedó fuera por el tope
+    for url, validators in fresh_validators.items():
+        if url in held_back:
+            continue
+        entry_state = state.setdefault(url, {})
+        for k, v in validators.items():
+            if v:
+                entry_state[k] = v
+            else:
+                entry_state.pop(k, None)
+
+    # La marca de agua avanza hasta lo más reciente entregado, pero sin pasar de lo
+    # más antiguo que quedó fuera (los feeds suelen venir de más nuevo a más antiguo)
+    for url, ts in newest.items():
+        ts = min(ts, held_back.get(url, ts))
+        entry_state = state.setdefault(url, {})
+        entry_state["watermark"] = max(ts, entry_state.get("watermark") or ts)
+        entry_state["checked_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
     return all_articles
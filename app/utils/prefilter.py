@@ -0,0 +1,207 @@
+import os
+import json
+import zlib
+import time
+import hashlib
+import numpy as np
+from app.utils.card_fields import clean_text_of
+from app.utils.textnorm import tokenize
+
+MODEL_PATH = os.path.join("data", "prefilter_model.npz")
+N_FEATURES = 1 << 18
+# Fracción de ids (por hash, estable entre ejecuciones) que se reserva para evaluar
+HOLDOUT_MOD = 5
+# relevance_version de lo decidido por el prefiltro: "prefilter-<huella de los pesos>"
+VERSION_PREFIX = "prefilter-"
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+# Por debajo de LOW se descarta sin Gemini; por encima de HIGH se da por relevante.
+# Entre medias (banda de duda) decide Gemini.
+PREFILTER_LOW = _env_float("PREFILTER_LOW", 0.05)
+PREFILTER_HIGH = _env_float("PREFILTER_HIGH", 0.97)
+
+# Puerta de promoción: un modelo reentrenado solo sustituye al actual si en los reservados
+# hay muestra suficiente, no descarta relevantes y acierta al aceptar sin Gemini
+GATE_MIN_HOLDOUT = int(_env_float("PREFILTER_GATE_MIN_HOLDOUT", 50))
+GATE_MAX_MISSED = int(_env_float("PREFILTER_GATE_MAX_MISSED", 0))
+GATE_MIN_PRECISION = _env_float("PREFILTER_GATE_MIN_PRECISION", 0.95)
+
+# ─────────────────────────────────────────────────────────────
+# Texto → características (n-gramas con hashing, sin vocabulario)
+# ─────────────────────────────────────────────────────────────
+def training_text(article: dict) -> str:
+    return f"{article.get('title', '')} {clean_text_of(article)}"
+
+def _hash(token: str) -> int:
+    # crc32 y no hash(): el de Python cambia en cada proceso
+    return zlib.crc32(token.encode("utf-8")) % N_FEATURES
+
+def featurize(article: dict):
+    """(índices, valores) dispersos: unigramas + bigramas + categoría, log(1+tf) normalizado L2."""
+    tokens = tokenize(training_text(article))
+    grams = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    grams.append(f"cat={(article.get('category') or '').lower()}")
+    counts = {}
+    for g in grams:
+        h = _hash(g)
+        counts[h] = counts.get(h, 0) + 1
+    idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    val = np.log1p(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    norm = np.linalg.norm(val)
+    return idx, (val / norm if norm else val)
+
+# ─────────────────────────────────────────────────────────────
+# Regresión logística dispersa (SGD, solo NumPy)
+# ─────────────────────────────────────────────────────────────
+def _sigmoid(z: float) -> float:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+def train(samples, epochs=25, lr=0.5, l2=1e-5, seed=13) -> dict:
+    """samples: [(article, bool)] → {"w", "b", "meta"}. Clases equilibradas por peso."""
+    feats = [featurize(a) for a, _ in samples]
+    y = np.array([1.0 if label else 0.0 for _, label in samples])
+    pos = max(1.0, y.sum())
+    neg = max(1.0, len(y) - y.sum())
+    sample_w = np.where(y == 1.0, len(y) / (2 * pos), len(y) / (2 * neg))
+
+    w = np.zeros(N_FEATURES, dtype=np.float64)
+    b = 0.0
+    rng = np.random.default_rng(seed)
+    order = np.arange(len(samples))
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        step = lr / (1.0 + epoch * 0.2)
+        for i in order:
+            idx, val = feats[i]
+            p = _sigmoid(float(w[idx] @ val) + b)
+            g = (p - y[i]) * sample_w[i]
+            w[idx] -= step * (g * val + l2 * w[idx])
+            b -= step * g
+    return {
+        "w": w.astype(np.float32),
+        "b": float(b),
+        "meta": {"trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                 "n_samples": len(samples), "n_pos": int(y.sum())},
+    }
+
+def predict_proba(model: dict, article: dict) -> float:
+    idx, val = featurize(article)
+    return float(_sigmoid(float(model["w"][idx] @ val) + model["b"]))
+
+def local_verdict(model: dict, article: dict):
+    """True/False si el modelo está seguro; None si hay que preguntar a Gemini."""
+    return verdict_for_proba(predict_proba(model, article))
+
+def verdict_for_proba(p: float):
+    if p >= PREFILTER_HIGH:
+        return True
+    if p <= PREFILTER_LOW:
+        return False
+    return None
+
+def save_model(model: dict, path: str = MODEL_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez_compressed(tmp, w=model["w"], b=np.array([model["b"]]),
+                        meta=np.array(json.dumps(model.get("meta", {}))))
+    os.replace(tmp, path)
+
+def model_version(model: dict) -> str:
+    h = hashlib.sha256(np.ascontiguousarray(model["w"]).tobytes())
+    h.update(repr(float(model["b"])).encode("ascii"))
+    return VERSION_PREFIX + h.hexdigest()[:10]
+
+def decided_by_prefilter(article: dict) -> bool:
+    """Veredicto local (sin Gemini): no lo desfasa un cambio de prompt."""
+    return (article.get("decided_by") == "prefilter"
+            or str(article.get("relevance_version") or "").startswith(VERSION_PREFIX))
+
+def load_model(path: str = MODEL_PATH):
+    if os.getenv("PREFILTER_ENABLED", "1").strip().lower() in ("0", "false", "no"):
+        return None
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as z:
+            model = {"w": z["w"], "b": float(z["b"][0]), "meta": json.loads(str(z["meta"]))}
+        model["version"] = model_version(model)
+        return model
+    except Exception as e:
+        print(f"[!] No pude cargar el prefiltro {path}: {e}", flush=True)
+        return None
+
+# ─────────────────────────────────────────────────────────────
+# Datos de entrenamiento y evaluación
+# ─────────────────────────────────────────────────────────────
+def is_holdout(art_id: str) -> bool:
+    return zlib.crc32((art_id or "").encode("utf-8")) % HOLDOUT_MOD == 0
+
+def labeled_samples(curated: dict, trends: list, rejected: list):
+    """
+    [(article, bool)] con veredictos de Gemini: positivos = trends, negativos = textos
+    guardados de descartadas. Lo que decidió el propio prefiltro no entra (no se
+    reentrena con sus propias respuestas).
+    """
+    out = []
+    for a in trends:
+        if curated.get(a.get("id")) is True and a.get("decided_by") != "prefilter":
+            out.append((a, True))
+    for a in rejected:
+        if curated.get(a.get("id")) is False and a.get("decided_by") != "prefilter":
+            out.append((a, False))
+    return out
+
+def evaluate(model: dict, samples, low: float = None, high: float = None) -> dict:
+    """Precision/recall a 0.5 y, para la banda segura, cobertura y errores."""
+    low = PREFILTER_LOW if low is None else low
+    high = PREFILTER_HIGH if high is None else high
+    tp = fp = fn = tn = 0
+    auto_pos = auto_pos_ok = auto_neg = auto_neg_missed = 0
+    for article, label in samples:
+        p = predict_proba(model, article)
+        pred = p >= 0.5
+        tp += pred and label
+        fp += pred and not label
+        fn += (not pred) and label
+        tn += (not pred) and not label
+        if p >= high:
+            auto_pos += 1
+            auto_pos_ok += label
+        elif p <= low:
+            auto_neg += 1
+            auto_neg_missed += label
+    n = len(samples)
+    return {
+        "n": n,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "accuracy": (tp + tn) / n if n else 0.0,
+        "local_coverage": (auto_pos + auto_neg) / n if n else 0.0,
+        "auto_accept_precision": auto_pos_ok / auto_pos if auto_pos else None,
+        "auto_reject_missed_positives": auto_neg_missed,
+        "thresholds": {"low": low, "high": high},
+    }
+
+def promotion_problems(metrics: dict, min_holdout: int = None, max_missed: int = None,
+                       min_precision: float = None) -> list:
+    """Motivos por los que un modelo evaluado con evaluate() no debe promocionarse ([] = apto)."""
+    min_holdout = GATE_MIN_HOLDOUT if min_holdout is None else min_holdout
+    max_missed = GATE_MAX_MISSED if max_missed is None else max_missed
+    min_precision = GATE_MIN_PRECISION if min_precision is None else min_precision
+    problems = []
+    n = int(metrics.get("n") or 0)
+    if n < min_holdout:
+        problems.append(f"solo {n} reservados (mínimo {min_holdout})")
+    missed = int(metrics.get("auto_reject_missed_positives") or 0)
+    if missed > max_missed:
+        problems.append(f"{missed} relevantes descartadas sin Gemini (máximo {max_missed})")
+    precision = metrics.get("auto_accept_precision")
+    # None = no acepta nada sin Gemini en los reservados: no hay riesgo que medir
+    if precision is not None and precision < min_precision:
+        problems.append(f"precisión al aceptar sin Gemini {precision:.3f} (mínimo {min_precision})")
+    return problems
@@ -0,0 +1,55 @@
+import os
+import re
+from functools import lru_cache
+from app.utils.card_fields import clean_text_of
+
+# ─────────────────────────────────────────────────────────────
+# Texto de las noticias para los prompts: sin HTML ni URLs y con tope de tokens
+# ─────────────────────────────────────────────────────────────
+# Gemini cuenta ~4 caracteres por token en ES/EN; para recortar basta la estimación
+# (el recuento real de cada llamada llega en usage_metadata y va a run_metrics).
+CHARS_PER_TOKEN = 4
+
+def _env_int(name, default):
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+# Tokens del resumen por noticia: prompts de una noticia y prompts por lotes
+SUMMARY_TOKENS = _env_int("PROMPT_SUMMARY_TOKENS", 160)
+BATCH_SUMMARY_TOKENS = _env_int("PROMPT_BATCH_SUMMARY_TOKENS", 80)
+
+_URL_RX = re.compile(r"(https?://|www\.)\S+", re.IGNORECASE)
+_SPACE_RX = re.compile(r"\s+")
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Corta en el último espacio antes del tope (≈ max_tokens) y marca el corte con '…'."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if not max_tokens or len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip(" ,;:.-") + "…"
+
+@lru_cache(maxsize=8192)
+def _compact(clean_text: str, max_tokens: int) -> str:
+    text = _SPACE_RX.sub(" ", _URL_RX.sub("", clean_text)).strip()
+    return truncate_to_tokens(text, max_tokens)
+
+def prompt_summary(article: dict, max_tokens: int = SUMMARY_TOKENS) -> str:
+    """Resumen limpio (el `clean_text` del colector o el HTML ya extraído) recortado a `max_tokens`."""
+    return _compact(clean_text_of(article), max_tokens)
+
+def article_block(article: dict, max_tokens: int = SUMMARY_TOKENS) -> str:
+    """Título / Resumen / Categoría de una noticia para el prompt (el enlace no aporta nada al modelo)."""
+    return (
+        f"Título: {_SPACE_RX.sub(' ', article.get('title', '') or '').strip()}\n"
+        f"Resumen: {prompt_summary(article, max_tokens)}\n"
+        f"Categoría: {article.get('category', '')}"
+    )
@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+DATA_DIR = "data"
+# Una línea por rerun perfilado: para comparar builds con los mismos datos
+PROFILE_LOG_PATH = os.path.join(DATA_DIR, "dashboard_profile.jsonl")
+
+# ─────────────────────────────────────────────────────────────
+# Perfil de un rerun del dashboard (opt-in: AURA_PROFILE=1 o ?profile=1)
+# ─────────────────────────────────────────────────────────────
+# Streamlit ejecuta cada rerun de una sesión en su propio hilo: el perfil activo es
+# por hilo y, si no hay ninguno, stage()/count() no hacen nada (coste ~nulo).
+_LOCAL = threading.local()
+
+def env_enabled() -> bool:
+    return os.getenv("AURA_PROFILE", "").strip().lower() in ("1", "true", "yes")
+
+class RerunProfile:
+    """
+    Tiempos por etapa (acumulados: una etapa que se repite por tarjeta suma todas
+    sus llamadas) y contadores (lecturas de ficheros, parseos HTML…) de un rerun.
+    Las etapas pueden anidarse ("card" incluye "card.fields"): se muestran tal cual.
+    """
+
+    def __init__(self, page: str):
+        self.page = page
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.total_s = None
+
+    def add(self, name: str, seconds: float):
+        s = self.stages.setdefault(name, [0.0, 0])
+        s[0] += seconds
+        s[1] += 1
+
+    def incr(self, name: str, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self):
+        self.total_s = time.perf_counter() - self._t0
+        return self
+
+    def as_dict(self) -> dict:
+        return {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+            "page": self.page,
+            "build": build_id(),
+            "total_ms": round((self.total_s or 0.0) * 1000, 1),
+            "stages": {k: {"ms": round(v[0] * 1000, 1), "n": v[1]}
+                       for k, v in sorted(self.stages.items(), key=lambda kv: kv[1][0], reverse=True)},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+def start(page: str) -> RerunProfile:
+    _LOCAL.profile = RerunProfile(page)
+    return _LOCAL.profile
+
+def stop():
+    prof = getattr(_LOCAL, "profile", None)
+    _LOCAL.profile = None
+    return prof.finish() if prof is not None else None
+
+def active() -> bool:
+    return getattr(_LOCAL, "profile", None) is not None
+
+@contextmanager
+def stage(name: str):
+    prof = getattr(_LOCAL, "profile", None)
+    if prof is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add(name, time.perf_counter() - t0)
+
+def count(name: str, n=1):
+    prof = getattr(_LOCAL, "profile", None)
+    if prof is not None:
+        prof.incr(name, n)
+
+@lru_cache(maxsize=1)
+def build_id() -> str:
+    """AURA_BUILD o el commit del checkout (leído de .git, sin lanzar git)."""
+    env = os.getenv("AURA_BUILD", "").strip()
+    if env:
+        return env
+    try:
+        with open(os.path.join(".git", "HEAD"), encoding="utf-8") as f:
+            head = f.read().strip()
+        if head.startswith("ref: "):
+            ref = head[5:]
+            ref_path = os.path.join(".git", ref)
+            if os.path.exists(ref_path):
+                with open(ref_path, encoding="utf-8") as f:
+                    return f.read().strip()[:12]
+            with open(os.path.join(".git", "packed-refs"), encoding="utf-8") as f:
+                for line in f:
+                    if line.rstrip().endswith(" " + ref):
+                        return line.split()[0][:12]
+            return ""
+        return head[:12]
+    except OSError:
+        return ""
@@ -0,0 +1,150 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from app.utils.jsonio import atomic_write_json, append_jsonl
+from app.utils.key_ledger import key_fingerprint
+
+DATA_DIR = "data"
+RUN_METRICS_PATH = os.path.join(DATA_DIR, "run_metrics.json")
+# Una línea por ejecución (sin cubetas) para ver la evolución entre días
+RUN_METRICS_HISTORY_PATH = os.path.join(DATA_DIR, "run_metrics_history.jsonl")
+
+# Límites superiores (s) de las cubetas de los histogramas de latencia
+_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class Histogram:
+    """Histograma de latencias con cubetas fijas; los percentiles son el límite de la cubeta."""
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        seconds = max(0.0, float(seconds))
+        self.counts[bisect.bisect_left(_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(_BUCKETS[i], self.max) if i < len(_BUCKETS) else self.max
+        return self.max
+
+    def snapshot(self, buckets=True) -> dict:
+        out = {
+            "count": self.count,
+            "sum_s": round(self.total, 3),
+            "mean_s": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_s": round(self.quantile(0.5), 3),
+            "p95_s": round(self.quantile(0.95), 3),
+            "max_s": round(self.max, 3),
+        }
+        if buckets:
+            labels = [f"le_{b:g}" for b in _BUCKETS] + ["inf"]
+            out["buckets"] = {label: n for label, n in zip(labels, self.counts) if n}
+        return out
+
+class RunMetrics:
+    """
+    Contadores e histogramas de una ejecución del colector, globales y por clave.
+    - incr("gemini.429_minute", key=k), observe("gemini.call", 1.3, key=k)
+    - with timer("feeds.download"): …
+    Las claves se guardan por su huella (como en key_health.json), nunca en claro.
+    write() vuelca data/run_metrics.json y añade el resumen al histórico JSONL.
+    Seguro entre hilos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._t0 = time.monotonic()
+            self.counters = {}
+            self.histograms = {}
+            self.by_key = {}
+
+    def _key_bucket(self, key):
+        fp = key_fingerprint(key)
+        return self.by_key.setdefault(fp, {"counters": {}, "histograms": {}})
+
+    def incr(self, name: str, n=1, key: str = None):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            if key:
+                kc = self._key_bucket(key)["counters"]
+                kc[name] = kc.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float, key: str = None):
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).observe(seconds)
+            if key:
+                self._key_bucket(key)["histograms"].setdefault(name, Histogram()).observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, key: str = None):
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - t0, key=key)
+
+    def snapshot(self, buckets=True, **extra) -> dict:
+        with self._lock:
+            out = {
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at)),
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "wall_s": round(time.monotonic() - self._t0, 3),
+                **extra,
+                "counters": dict(sorted(self.counters.items())),
+                "histograms": {k: h.snapshot(buckets) for k, h in sorted(self.histograms.items())},
+                "by_key": {
+                    fp: {
+                        "counters": dict(sorted(v["counters"].items())),
+                        "histograms": {k: h.snapshot(buckets) for k, h in sorted(v["histograms"].items())},
+                    }
+                    for fp, v in sorted(self.by_key.items())
+                },
+            }
+        return out
+
+    def write(self, path=RUN_METRICS_PATH, history_path=RUN_METRICS_HISTORY_PATH, **extra) -> dict:
+        snap = self.snapshot(**extra)
+        atomic_write_json(path, snap)
+        if history_path:
+            append_jsonl(history_path, self.snapshot(buckets=False, **extra))
+        return snap
+
+    def summary(self) -> str:
+        """Una línea para el log: dónde se ha ido el tiempo de la ejecución."""
+        with self._lock:
+            h = self.histograms
+            parts = [f"{time.monotonic() - self._t0:.1f}s totales"]
+            for name, label in (("stage.fetch_feeds", "feeds"), ("gemini.call", "Gemini"),
+                                ("gemini.wait_pace", "ritmo"), ("gemini.wait_backoff", "backoff"),
+                                ("store.compact", "compactar")):
+                if name in h:
+                    parts.append(f"{label} {h[name].total:.1f}s")
+            c = self.counters
+            if c.get("gemini.calls"):
+                parts.append(f"tokens {c.get('gemini.tokens_in', 0)} in / {c.get('gemini.tokens_out', 0)} out")
+        return "métricas: " + ", ".join(parts)
+
+# Instancia de la ejecución en curso (un proceso = una ejecución del colector)
+METRICS = RunMetrics()
+incr = METRICS.incr
+observe = METRICS.observe
+timer = METRICS.timer
@@ -0,0 +1,210 @@
+import os
+import math
+import threading
+from app.utils.card_fields import clean_text_of
+from app.utils.jsonio import read_json, atomic_write_json
+from app.utils.textnorm import tokenize
+from app.utils.trend_shards import shard_month
+
+SEARCH_INDEX_PATH = os.path.join("data", "search_index.json")
+INDEX_VERSION = 1
+
+# BM25 clásico; el título cuenta doble
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 2
+
+# ─────────────────────────────────────────────────────────────
+# Normalización: sin tildes (textnorm.fold), stopwords y stemming ligero ES/EN
+# ─────────────────────────────────────────────────────────────
+_STOPWORDS = set("""
+de la el en y a los las del se un una por con para al lo su sus es que como mas pero ya o
+este esta estos estas ese esa eso entre sobre tras sin muy hay ha han son ser fue era
+the of and to in for on with at by from is are was be as an it its this that or but not
+""".split())
+
+# De más largo a más corto: se quita el primero que encaje dejando al menos 4 letras
+_SUFFIXES = (
+    "amientos", "imientos", "aciones", "uciones", "amiento", "imiento", "idades",
+    "mente", "acion", "ucion", "istas", "ismos", "ables", "ibles", "idad", "ista", "ismo",
+    "able", "ible", "ness", "ings", "ing", "edly", "ed", "ies", "es", "s",
+)
+
+def stem(token: str) -> str:
+    """
+    Stemming ligero (no Snowball): plurales y derivaciones frecuentes en ES/EN
+    y la vocal final de género (gastronómico/gastronómica → gastronom).
+    Se aplica igual a documentos y consultas, que es lo único que importa.
+    """
+    for suf in _SUFFIXES:
+        if token.endswith(suf) and len(token) - len(suf) >= 4:
+            token = token[:-len(suf)]
+            break
+    if len(token) > 4 and token[-1] in "aeo":
+        token = token[:-1]
+    return token
+
+def analyze(text: str) -> list:
+    return [stem(t) for t in tokenize(text) if t not in _STOPWORDS]
+
+def _document_terms(article: dict) -> list:
+    ideas = article.get("activation_ideas") or []
+    body = " ".join([
+        clean_text_of(article),
+        article.get("why_it_matters") or "",
+        " ".join(i for i in ideas if isinstance(i, str)),
+    ])
+    return analyze(article.get("title") or "") * TITLE_WEIGHT + analyze(body)
+
+class SearchIndex:
+    """
+    Índice invertido BM25 sobre título, texto limpio, why_it_matters y activation_ideas.
+    - add(): incremental (el colector añade cada relevante al guardarla).
+    - replace()/remove(): reindexar una noticia reenriquecida / quitar una descartada.
+      El documento viejo queda como lápida (`_dead`, fuera de df, avgdl y resultados)
+      y save() compacta las postings antes de escribir.
+    - search(): [(id, mes, score)] de mayor a menor puntuación.
+    Persistido en data/search_index.json como
+    {"ids": [...], "months": [...], "lens": [...], "postings": {término: [doc, tf, doc, tf, …]}},
+    con los documentos por posición para que el fichero sea compacto.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        self.ids = []
+        self.months = []
+        self.lens = []
+        self.postings = {}
+        self._pos = {}
+        self._total_len = 0
+        self._dead = set()
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._queries = {}
+        if path:
+            data = read_json(path, default={})
+            if isinstance(data, dict) and data.get("version") == INDEX_VERSION:
+                self.ids = list(data.get("ids") or [])
+                self.months = list(data.get("months") or [])
+                self.lens = list(data.get("lens") or [])
+                self.postings = dict(data.get("postings") or {})
+                self._pos = {art_id: i for i, art_id in enumerate(self.ids)}
+                self._total_len = sum(self.lens)
+
+    def __len__(self):
+        return len(self.ids) - len(self._dead)
+
+    def __contains__(self, art_id):
+        return art_id in self._pos
+
+    def add(self, article: dict) -> bool:
+        art_id = article.get("id")
+        if not art_id or art_id in self._pos:
+            return False
+        terms = _document_terms(article)
+        tf = {}
+        for t in terms:
+            tf[t] = tf.get(t, 0) + 1
+        with self._lock:
+            doc = len(self.ids)
+            self.ids.append(art_id)
+            self.months.append(shard_month(article))
+            self.lens.append(len(terms))
+            self._pos[art_id] = doc
+            self._total_len += len(terms)
+            for t, n in tf.items():
+                self.postings.setdefault(t, []).extend((doc, n))
+            self._queries.clear()
+            self.dirty = True
+        return True
+
+    def remove(self, art_id) -> bool:
+        with self._lock:
+            doc = self._pos.pop(art_id, None)
+            if doc is None:
+                return False
+            self._dead.add(doc)
+            self._total_len -= self.lens[doc]
+            self._queries.clear()
+            self.dirty = True
+        return True
+
+    def replace(self, article: dict) -> bool:
+        """Reindexa `article` con su texto actual (p. ej. why/ideas nuevos)."""
+        self.remove(article.get("id"))
+        return self.add(article)
+
+    def _compact(self):
+        """Quita las lápidas y renumera los documentos (con el lock tomado)."""
+        if not self._dead:
+            return
+        new_doc = {}
+        ids, months, lens = [], [], []
+        for doc, art_id in enumerate(self.ids):
+            if doc in self._dead:
+                continue
+            new_doc[doc] = len(ids)
+            ids.append(art_id)
+            months.append(self.months[doc])
+            lens.append(self.lens[doc])
+        postings = {}
+        for term, plist in self.postings.items():
+            kept = []
+            for i in range(0, len(plist), 2):
+                doc = new_doc.get(plist[i])
+                if doc is not None:
+                    kept.extend((doc, plist[i + 1]))
+            if kept:
+                postings[term] = kept
+        self.ids, self.months, self.lens, self.postings = ids, months, lens, postings
+        self._pos = {art_id: i for i, art_id in enumerate(ids)}
+        self._total_len = sum(lens)
+        self._dead = set()
+        self._queries.clear()
+
+    def save(self):
+        if not self.dirty:
+            return
+        with self._lock:
+            self._compact()
+            atomic_write_json(self.path, {
+                "version": INDEX_VERSION,
+                "ids": self.ids,
+                "months": self.months,
+                "lens": self.lens,
+                "postings": self.postings,
+            }, indent=None)
+            self.dirty = False
+
+    def search(self, query: str, limit: int = 50) -> list:
+        terms = list(dict.fromkeys(analyze(query)))
+        cache_key = (tuple(terms), limit)
+        with self._lock:
+            if cache_key in self._queries:
+                return self._queries[cache_key]
+            dead = self._dead
+            n_docs = len(self.ids) - len(dead)
+            if not terms or not n_docs:
+                return []
+            avg_len = self._total_len / n_docs or 1.0
+            scores = {}
+            for t in terms:
+                plist = self.postings.get(t)
+                if not plist:
+                    continue
+                pairs = list(zip(plist[0::2], plist[1::2]))
+                if dead:
+                    pairs = [(doc, tf) for doc, tf in pairs if doc not in dead]
+                df = len(pairs)
+                if not df:
+                    continue
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc, tf in pairs:
+                    norm = tf + BM25_K1 * (1.0 - BM25_B + BM25_B * self.lens[doc] / avg_len)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1.0) / norm
+            top = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+            out = [(self.ids[doc], self.months[doc], score) for doc, score in top]
+            if len(self._queries) >= 256:
+                self._queries.clear()
+            self._queries[cache_key] = out
+            return out
@@ -1,46 +1,108 @@
 import os
-import json
+import threading
 from typing import List, Dict
+from app.utils.jsonio import read_json, atomic_write_json, append_jsonl, read_jsonl
+from app.utils import rerun_profile
 
 DATA_DIR = "data"
 SAVED_PATH = os.path.join(DATA_DIR, "saved.json")
+SAVED_JOURNAL_PATH = os.path.join(DATA_DIR, "saved.log.jsonl")
+# Cada cuántos cambios se vuelca el diario a saved.json
+SAVED_COMPACT_EVERY = 50
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def _read_json(path, default):
+# ─────────────────────────────────────────────────────────────
+# Índice en memoria (compartido por todas las sesiones del servidor)
+# ─────────────────────────────────────────────────────────────
+_LOCK = threading.RLock()
+_INDEX = {"signature": None, "by_id": {}, "journal_ops": 0}
+
+def _stat(path):
     try:
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception:
-        pass
-    return default
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _signature():
+    return (_stat(SAVED_PATH), _stat(SAVED_JOURNAL_PATH))
+
+def _rebuild():
+    data = read_json(SAVED_PATH, default=[])
+    by_id = {}
+    for a in (data if isinstance(data, list) else []):
+        if isinstance(a, dict) and a.get("id"):
+            by_id[a["id"]] = a
+    ops = read_jsonl(SAVED_JOURNAL_PATH)
+    for op in ops:
+        if op.get("op") == "add" and isinstance(op.get("article"), dict):
+            by_id[op["article"].get("id")] = op["article"]
+        elif op.get("op") == "remove":
+            by_id.pop(op.get("id"), None)
+    _INDEX["by_id"] = by_id
+    _INDEX["journal_ops"] = len(ops)
+
+def _index() -> Dict[str, Dict]:
+    """id → artículo. Solo se relee del disco si cambia el mtime/tamaño de los ficheros."""
+    rerun_profile.count("saved.index")
+    with _LOCK:
+        sig = _signature()
+        if sig != _INDEX["signature"]:
+            rerun_profile.count("saved.rebuild")
+            _rebuild()
+            _INDEX["signature"] = sig
+        return _INDEX["by_id"]
 
-def _save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def _compact():
+    atomic_write_json(SAVED_PATH, list(_INDEX["by_id"].values()))
+    if os.path.exists(SAVED_JOURNAL_PATH):
+        os.remove(SAVED_JOURNAL_PATH)
+    _INDEX["journal_ops"] = 0
 
+# ─────────────────────────────────────────────────────────────
+# API pública
+# ─────────────────────────────────────────────────────────────
 def get_saved() -> List[Dict]:
-    data = _read_json(SAVED_PATH, default=[])
-    return data if isinstance(data, list) else []
+    return list(_index().values())
 
 def is_saved(art_id: str) -> bool:
-    for a in get_saved():
-        if a.get("id") == art_id:
-            return True
-    return False
+    return art_id in _index()
 
 def toggle_save(article: Dict) -> bool:
     """
     Alterna guardado. Devuelve True si queda guardado, False si se elimina.
+    Cada cambio es una línea en el diario (saved.log.jsonl); cada
+    SAVED_COMPACT_EVERY cambios se reescribe saved.json de forma atómica.
+    """
+    art_id = article.get("id")
+    with _LOCK:
+        by_id = _index()
+        if art_id in by_id:
+            by_id.pop(art_id)
+            append_jsonl(SAVED_JOURNAL_PATH, {"op": "remove", "id": art_id})
+            saved = False
+        else:
+            by_id[art_id] = article
+            append_jsonl(SAVED_JOURNAL_PATH, {"op": "add", "article": article})
+            saved = True
+        _INDEX["journal_ops"] += 1
+        if _INDEX["journal_ops"] >= SAVED_COMPACT_EVERY:
+            _compact()
+        # Lo que acabamos de escribir ya está en el índice: no hace falta releer
+        _INDEX["signature"] = _signature()
+        return saved
+
+def update_saved(transform) -> int:
+    """
+    Aplica `transform(article) -> bool` a cada guardada (True = ha cambiado) y,
+    si hubo cambios, reescribe saved.json de una vez. Devuelve cuántas cambiaron.
+    Pensado para backfills puntuales.
     """
-    saved = get_saved()
-    idx = next((i for i, a in enumerate(saved) if a.get("id")==article.get("id")), None)
-    if idx is None:
-        saved.append(article)
-        _save_json(SAVED_PATH, saved)
-        return True
-    else:
-        saved.pop(idx)
-        _save_json(SAVED_PATH, saved)
-        return False
+    with _LOCK:
+        by_id = _index()
+        changed = sum(1 for a in by_id.values() if transform(a))
+        if changed or _INDEX["journal_ops"]:
+            _compact()
+        _INDEX["signature"] = _signature()
+        return changed
@@ -0,0 +1,12 @@
+import re
+import unicodedata
+
+_TOKEN_RX = re.compile(r"[a-z0-9]{2,}")
+
+def fold(text: str) -> str:
+    """Minúsculas y sin tildes: 'Málaga' → 'malaga'."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RX.findall(fold(text))
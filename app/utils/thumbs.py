@@ -0,0 +1,214 @@
+import os
+import io
+import base64
+import hashlib
+import tempfile
+import threading
+from functools import lru_cache
+import requests
+from app.utils import rerun_profile
+from app.utils.dates import published_ts
+
+# Streamlit sirve static/ (junto a streamlit_app.py) en app/static/ con server.enableStaticServing.
+# No sigue symlinks que salgan de static/: las miniaturas tienen que vivir dentro.
+STATIC_DIR = "static"
+STATIC_URL = "app/static"
+THUMBS_DIR = os.path.join(STATIC_DIR, "thumbs")
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+# Lado mayor de la miniatura: la columna de imagen de la tarjeta ronda 300px, ×1.5 para tablets
+THUMB_MAX_PX = int(_env_float("THUMB_MAX_PX", 480))
+THUMB_QUALITY = int(_env_float("THUMB_QUALITY", 70))
+# No descargamos originales mayores que esto (algunos CDNs sirven 5-10 MB)
+THUMB_MAX_DOWNLOAD_BYTES = int(_env_float("THUMB_MAX_DOWNLOAD_MB", 8) * 1024 * 1024)
+# Desactivable (THUMBS_ENABLED=0): p. ej. si el dashboard no va a ver static/thumbs
+THUMBS_ENABLED = os.getenv("THUMBS_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+# Tope de static/thumbs (se commitea con los datos): al pasarse, fuera las más antiguas
+THUMBS_MAX_BYTES = int(_env_float("THUMBS_MAX_MB", 15) * 1024 * 1024)
+THUMBS_MAX_COUNT = int(_env_float("THUMBS_MAX_COUNT", 500))
+_TIMEOUT = (5, 15)
+_HEADERS = {"User-Agent": "aura-trends-collector (+thumbnails)"}
+
+_LOCK = threading.Lock()
+_STATE = {"bytes": None}
+
+def thumb_name(url: str, ext: str = "webp") -> str:
+    return f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]}.{ext}"
+
+def _path(name: str, folder: str = THUMBS_DIR) -> str:
+    return os.path.join(folder, name)
+
+# ─────────────────────────────────────────────────────────────
+# Colector: descarga + miniatura WebP (JPEG si Pillow no trae WebP)
+# ─────────────────────────────────────────────────────────────
+def _download(url: str) -> bytes:
+    with requests.get(url, headers=_HEADERS, timeout=_TIMEOUT, stream=True) as resp:
+        resp.raise_for_status()
+        ctype = resp.headers.get("Content-Type", "")
+        if ctype and not ctype.startswith("image/"):
+            raise ValueError(f"no es una imagen ({ctype})")
+        buf = io.BytesIO()
+        for block in resp.iter_content(64 * 1024):
+            buf.write(block)
+            if buf.tell() > THUMB_MAX_DOWNLOAD_BYTES:
+                raise ValueError("imagen demasiado grande")
+        return buf.getvalue()
+
+def _encode(raw: bytes):
+    """(bytes, extensión) de la miniatura."""
+    from PIL import Image, features
+    with Image.open(io.BytesIO(raw)) as img:
+        img.thumbnail((THUMB_MAX_PX, THUMB_MAX_PX))
+        out = io.BytesIO()
+        if features.check("webp"):
+            img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+            img.save(out, "WEBP", quality=THUMB_QUALITY, method=4)
+            return out.getvalue(), "webp"
+        img.convert("RGB").save(out, "JPEG", quality=THUMB_QUALITY, optimize=True, progressive=True)
+        return out.getvalue(), "jpg"
+
+def make_thumbnail(url: str, folder: str = THUMBS_DIR):
+    """
+    Nombre del fichero de la miniatura de `url` en `folder` (la crea si no existe),
+    o None si no se puede (sin Pillow, URL no http, descarga fallida…).
+    Seguro entre hilos; si la miniatura ya existe no se vuelve a descargar.
+    """
+    if not THUMBS_ENABLED or not url or not url.startswith(("http://", "https://")):
+        return None
+    for ext in ("webp", "jpg"):
+        if os.path.exists(_path(thumb_name(url, ext), folder)):
+            return thumb_name(url, ext)
+    try:
+        data, ext = _encode(_download(url))
+    except ImportError:
+        print("[!] Pillow no está instalado: las tarjetas usarán la imagen remota.", flush=True)
+        return None
+    except Exception as e:
+        print(f"[!] Miniatura no disponible {url[:80]}: {e}", flush=True)
+        return None
+    name = thumb_name(url, ext)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=f".{ext}", dir=folder)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, _path(name, folder))
+    _account(len(data), folder)
+    return name
+
+def add_thumbnail(article: dict, folder: str = THUMBS_DIR) -> bool:
+    """Pone `thumb` (nombre en static/thumbs) a partir de `image_url`. True si ha cambiado algo."""
+    url = article.get("image_url")
+    if not url or article.get("thumb"):
+        return False
+    name = make_thumbnail(url, folder)
+    if name:
+        article["thumb"] = name
+        return True
+    return False
+
+def _entries(folder):
+    out = []
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return out
+    for name in names:
+        if name.startswith(".tmp-"):
+            continue
+        p = os.path.join(folder, name)
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        out.append((st.st_mtime, st.st_size, p))
+    return out
+
+def _account(size: int, folder: str):
+    with _LOCK:
+        if _STATE["bytes"] is None:
+            _STATE["bytes"] = sum(s for _, s, _ in _entries(folder))
+        else:
+            _STATE["bytes"] += size
+        if _STATE["bytes"] > THUMBS_MAX_BYTES:
+            # Bajamos al 90% del máximo empezando por las más antiguas
+            entries = sorted(_entries(folder))
+            total = sum(s for _, s, _ in entries)
+            for _, s, p in entries:
+                if total <= int(THUMBS_MAX_BYTES * 0.9):
+                    break
+                try:
+                    os.remove(p)
+                    total -= s
+                except OSError:
+                    pass
+            _STATE["bytes"] = total
+
+def prune_thumbnails(articles, folder: str = THUMBS_DIR) -> int:
+    """
+    Deja en `folder` solo las miniaturas de `articles` (guardadas + relevantes en caliente),
+    de la noticia más reciente a la más antigua hasta THUMBS_MAX_COUNT / THUMBS_MAX_BYTES.
+    En CI el mtime es el del checkout: el orden sale de `published`, no del fichero.
+    Devuelve cuántas se han borrado.
+    """
+    sizes = {os.path.basename(p): s for _, s, p in _entries(folder)}
+    keep, total = set(), 0
+    for art in sorted(articles, key=published_ts, reverse=True):
+        name = os.path.basename(art.get("thumb") or "")
+        if name not in sizes or name in keep:
+            continue
+        if len(keep) >= THUMBS_MAX_COUNT or total + sizes[name] > THUMBS_MAX_BYTES:
+            break
+        keep.add(name)
+        total += sizes[name]
+    removed = 0
+    for name in sizes:
+        if name in keep:
+            continue
+        try:
+            os.remove(_path(name, folder))
+            removed += 1
+        except OSError:
+            pass
+    with _LOCK:
+        _STATE["bytes"] = total
+    return removed
+
+# ─────────────────────────────────────────────────────────────
+# Dashboard: URL estática de la miniatura local; data URI si el servidor no sirve
+# static/; None → imagen remota
+# ─────────────────────────────────────────────────────────────
+@lru_cache(maxsize=1)
+def _static_serving() -> bool:
+    try:
+        import streamlit as st
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+@lru_cache(maxsize=1024)
+def _data_uri(path: str, mtime_ns: int) -> str:
+    rerun_profile.count("files.thumb")
+    with open(path, "rb") as f:
+        data = f.read()
+    mime = "image/webp" if path.endswith(".webp") else "image/jpeg"
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+def thumb_src(article: dict, folder: str = THUMBS_DIR):
+    name = article.get("thumb")
+    if not name:
+        return None
+    name = os.path.basename(name)
+    path = _path(name, folder)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None  # expulsada o aún no sincronizada
+    if folder == THUMBS_DIR and _static_serving():
+        # El navegador la pide aparte y la cachea: nada de base64 en cada rerun
+        return f"{STATIC_URL}/thumbs/{name}"
+    return _data_uri(path, mtime_ns)
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import hashlib
+from email.utils import parsedate_to_datetime
+from app.utils.jsonio import read_json, atomic_write_json
+
+DATA_DIR = "data"
+TRENDS_DIR = os.path.join(DATA_DIR, "trends")
+LEGACY_TRENDS_PATH = os.path.join(DATA_DIR, "trends.json")
+MANIFEST_NAME = "manifest.json"
+ARCHIVE_SUBDIR = "archive"
+MANIFEST_VERSION = 1
+
+def retention_months() -> int:
+    """Meses en el conjunto "caliente" (TRENDS_RETENTION_MONTHS, 6 por defecto; 0 = sin retención)."""
+    try:
+        return max(0, int(os.getenv("TRENDS_RETENTION_MONTHS", "6")))
+    except ValueError:
+        return 6
+
+# ─────────────────────────────────────────────────────────────
+# Shards mensuales: data/trends/YYYY-MM.json + manifest.json
+# ─────────────────────────────────────────────────────────────
+# El mes es el de recogida (`collected_at`); las entradas antiguas sin ese campo
+# usan el mes de `published` y, si no se puede leer, el mes actual.
+
+def now_iso() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+def current_month() -> str:
+    return time.strftime("%Y-%m", time.gmtime())
+
+def shard_month(article: dict) -> str:
+    collected = article.get("collected_at") or ""
+    if len(collected) >= 7 and collected[4] == "-":
+        return collected[:7]
+    try:
+        return parsedate_to_datetime(article.get("published") or "").strftime("%Y-%m")
+    except Exception:
+        return current_month()
+
+def months_before(month: str, n: int) -> str:
+    """El mes `n` meses antes de `month` (YYYY-MM)."""
+    year, mon = (int(x) for x in month.split("-"))
+    total = year * 12 + (mon - 1) - n
+    return f"{total // 12:04d}-{total % 12 + 1:02d}"
+
+def shard_path(month: str, folder: str = TRENDS_DIR, archived: bool = False) -> str:
+    base = os.path.join(folder, ARCHIVE_SUBDIR) if archived else folder
+    return os.path.join(base, f"{month}.json")
+
+def manifest_path(folder: str = TRENDS_DIR) -> str:
+    return os.path.join(folder, MANIFEST_NAME)
+
+def load_manifest(folder: str = TRENDS_DIR):
+    """
+    {"version", "shards": {mes: {"count", "updated_at"}}, "archived": {mes: {...}}}
+    o None si todavía no existe (antes de migrar trends.json).
+    """
+    data = read_json(manifest_path(folder), default=None)
+    if not isinstance(data, dict):
+        return None
+    data.setdefault("shards", {})
+    data.setdefault("archived", {})
+    return data
+
+def hot_months(manifest) -> list:
+    """Meses del conjunto caliente, el más reciente primero."""
+    return sorted((manifest or {}).get("shards", {}), reverse=True)
+
+def window_version(manifest, months: int) -> str:
+    """
+    Huella de los `months` shards más recientes según el manifest (mes, count, updated_at)
+    y de cuántos quedan fuera: si cambia, cualquier vista precalculada de esa ventana está desfasada.
+    """
+    available = hot_months(manifest)
+    chosen = available[:months]
+    parts = [[m, manifest["shards"][m].get("count"), manifest["shards"][m].get("updated_at")] for m in chosen]
+    raw = json.dumps([parts, len(available) - len(chosen)], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+class TrendShards:
+    """
+    Histórico de relevantes repartido por mes de recogida.
+    - Solo se cargan los shards que se tocan (normalmente el del mes en curso).
+    - add() coloca cada artículo en su shard; flush() reescribe solo los shards
+      modificados y el manifest (temporal + rename, como el resto de JSON).
+    - apply_retention() saca del conjunto caliente lo anterior a N meses que no
+      esté guardado por el usuario: va a data/trends/archive/YYYY-MM.json.
+    La primera vez, si hay un data/trends.json antiguo, se reparte en shards y se retira.
+    """
+
+    def __init__(self, folder: str = TRENDS_DIR, legacy_path: str = LEGACY_TRENDS_PATH):
+        self.folder = folder
+        self.manifest = load_manifest(folder)
+        self._loaded = {}   # mes → lista
+        self._ids = {}      # mes → ids del shard
+        self._dirty = set()
+        if self.manifest is None:
+            self.manifest = {"version": MANIFEST_VERSION, "shards": {}, "archived": {}}
+            if legacy_path and os.path.exists(legacy_path):
+                self._migrate(legacy_path)
+
+    def _migrate(self, legacy_path):
+        legacy = read_json(legacy_path, default=[])
+        for a in (legacy if isinstance(legacy, list) else []):
+            if isinstance(a, dict):
+                self.add(a)
+        self.flush(force_manifest=True)
+        os.remove(legacy_path)
+        print(f"[💾] {legacy_path} repartido en {len(self.manifest['shards'])} shards mensuales "
+              f"({len(legacy)} artículos) → {self.folder}/", flush=True)
+
+    def months(self) -> list:
+        return hot_months(self.manifest)
+
+    def count(self) -> int:
+        return sum(int(v.get("count", 0)) for v in self.manifest["shards"].values())
+
+    def load(self, month: str) -> list:
+        if month not in self._loaded:
+            items = read_json(shard_path(month, self.folder), default=[]) if month in self.manifest["shards"] else []
+            items = [a for a in items if isinstance(a, dict)] if isinstance(items, list) else []
+            self._loaded[month] = items
+            self._ids[month] = {a.get("id") for a in items}
+        return self._loaded[month]
+
+    def __contains__(self, art_id):
+        # Solo mira los shards ya cargados (los demás no se leen para esto)
+        return any(art_id in ids for ids in self._ids.values())
+
+    def add(self, article: dict) -> bool:
+        month = shard_month(article)
+        items = self.load(month)
+        if article.get("id") in self._ids[month]:
+            return False
+        items.append(article)
+        self._ids[month].add(article.get("id"))
+        self._dirty.add(month)
+        return True
+
+    def update(self, article: dict) -> bool:
+        """Sustituye la versión guardada de `article` (misma id, mismo mes); si no está, la añade."""
+        month = shard_month(article)
+        items = self.load(month)
+        for i, a in enumerate(items):
+            if a.get("id") == article.get("id"):
+                items[i] = article
+                self._dirty.add(month)
+                return True
+        return self.add(article)
+
+    def remove(self, article: dict) -> bool:
+        month = shard_month(article)
+        items = self.load(month)
+        keep = [a for a in items if a.get("id") != article.get("id")]
+        if len(keep) == len(items):
+            return False
+        self._loaded[month] = keep
+        self._ids[month].discard(article.get("id"))
+        self._dirty.add(month)
+        return True
+
+    def iter_items(self, include_archived: bool = False):
+        """Todos los artículos (carga todos los shards: solo para scripts, no para el dashboard)."""
+        for month in sorted(self.manifest["shards"]):
+            yield from self.load(month)
+        if include_archived:
+            for month in sorted(self.manifest["archived"]):
+                data = read_json(shard_path(month, self.folder, archived=True), default=[])
+                yield from (a for a in (data if isinstance(data, list) else []) if isinstance(a, dict))
+
+    def mark_dirty(self, month: str):
+        self._dirty.add(month)
+
+    def flush(self, force_manifest: bool = False):
+        if not self._dirty and not force_manifest:
+            return
+        for month in sorted(self._dirty):
+            items = self._loaded.get(month, [])
+            atomic_write_json(shard_path(month, self.folder), items)
+            self.manifest["shards"][month] = {"count": len(items), "updated_at": now_iso()}
+        self._dirty.clear()
+        self.manifest["version"] = MANIFEST_VERSION
+        atomic_write_json(manifest_path(self.folder), self.manifest)
+
+    def apply_retention(self, keep_ids=(), months: int = None) -> int:
+        """
+        Mueve a archive/ los artículos de shards con más de `months` meses
+        (TRENDS_RETENTION_MONTHS) salvo los de `keep_ids` (guardados). Devuelve cuántos.
+        """
+        months = retention_months() if months is None else months
+        if months <= 0:
+            return 0
+        cutoff = months_before(current_month(), months)
+        keep_ids = set(keep_ids)
+        moved = 0
+        for month in [m for m in self.months() if m <= cutoff]:
+            items = self.load(month)
+            keep = [a for a in items if a.get("id") in keep_ids]
+            out = [a for a in items if a.get("id") not in keep_ids]
+            if not out:
+                continue
+            archive = shard_path(month, self.folder, archived=True)
+            old = read_json(archive, default=[])
+            old = old if isinstance(old, list) else []
+            old_ids = {a.get("id") for a in old if isinstance(a, dict)}
+            archived = old + [a for a in out if a.get("id") not in old_ids]
+            # Primero el archivo y luego el shard caliente: un corte entre medias deja duplicado, no pérdida
+            atomic_write_json(archive, archived)
+            self.manifest["archived"][month] = {"count": len(archived), "updated_at": now_iso()}
+            moved += len(out)
+            if keep:
+                self._loaded[month] = keep
+                self._ids[month] = {a.get("id") for a in keep}
+                self._dirty.add(month)
+            else:
+                self._loaded.pop(month, None)
+                self._ids.pop(month, None)
+                self._dirty.discard(month)
+                self.manifest["shards"].pop(month, None)
+                try:
+                    os.remove(shard_path(month, self.folder))
+                except OSError:
+                    pass
+        if moved:
+            self.flush(force_manifest=True)
+        return moved
@@ -0,0 +1,253 @@
+import os
+import threading
+from app.utils.jsonio import read_json, read_json_gz, atomic_write_json_gz
+from app.utils.card_fields import render_fields
+from app.utils.dates import published_ts
+from app.utils.dedupe import DedupeIndex
+from app.utils.trend_shards import (TRENDS_DIR, LEGACY_TRENDS_PATH, load_manifest, hot_months, shard_path,
+                                    window_version, now_iso)
+from app.utils.search_index import SearchIndex, SEARCH_INDEX_PATH
+
+def default_months() -> int:
+    """Meses que carga Radar de entrada (TRENDS_VIEW_MONTHS, 2 por defecto: el actual y el anterior)."""
+    try:
+        return max(1, int(os.getenv("TRENDS_VIEW_MONTHS", "2")))
+    except ValueError:
+        return 2
+
+# ─────────────────────────────────────────────────────────────
+# Vista precalculada de los shards recientes de data/trends/
+# (cada shard se parsea solo si cambia; la vista solo si cambia alguno de la ventana)
+# ─────────────────────────────────────────────────────────────
+_LOCK = threading.Lock()
+_CACHE = {"signature": None, "view": None}
+_SHARDS = {}  # ruta → (firma, artículos)
+_BY_ID = {}   # ruta → (firma, {id: artículo})
+_SEARCH = {"signature": None, "index": None}
+_MANIFEST = {"signature": None, "manifest": None}
+_SNAPSHOT = {"signature": None, "view": None}
+
+# Instantánea de la ventana por defecto que escribe el colector al terminar (ver más abajo)
+SNAPSHOT_PATH = os.path.join("data", "dashboard_snapshot.json.gz")
+SNAPSHOT_VERSION = 1
+# Solo lo que usan la tarjeta (render_article, thumb_src) y ⭐ Guardar
+SNAPSHOT_FIELDS = ("id", "title", "link", "category", "published", "image_url", "snippet", "thumb",
+                   "why_it_matters", "activation_ideas")
+
+def _build_view(trends: list) -> dict:
+    # Partimos del orden inverso del fichero (lo último añadido primero) para que
+    # el sort estable deshaga empates a favor de lo más reciente recogido.
+    items = [a for a in reversed(trends) if isinstance(a, dict)]
+    items.sort(key=published_ts, reverse=True)
+    # Cada historia una sola vez (copias antiguas de la misma noticia en varios feeds)
+    seen = DedupeIndex(path=None)
+    unique = []
+    for a in items:
+        if seen.find(a) is None:
+            unique.append(a)
+        seen.add(a)
+    items = unique
+    by_category = {}
+    for a in items:
+        by_category.setdefault((a.get("category") or "").lower(), []).append(a)
+    return {"all": items, "by_category": by_category}
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _read_shard(path, sig):
+    cached = _SHARDS.get(path)
+    if cached and cached[0] == sig:
+        return cached[1]
+    data = read_json(path, default=[]) if sig else []
+    items = data if isinstance(data, list) else []
+    _SHARDS[path] = (sig, items)
+    return items
+
+def _manifest(folder):
+    """manifest.json, releído solo si cambia su mtime/tamaño."""
+    path = os.path.join(folder, "manifest.json")
+    sig = (path, _signature(path))
+    if sig != _MANIFEST["signature"]:
+        _MANIFEST["manifest"] = load_manifest(folder) if sig[1] else None
+        _MANIFEST["signature"] = sig
+    return _MANIFEST["manifest"]
+
+def _window(folder, legacy_path, months):
+    """[(ruta, firma)] de los `months` shards más recientes y cuántos quedan fuera."""
+    manifest = _manifest(folder)
+    if manifest is None:
+        # Aún sin migrar (el colector no ha pasado desde el cambio): trends.json entero
+        return [(legacy_path, _signature(legacy_path))], 0
+    available = hot_months(manifest)
+    chosen = available[:months]
+    return [(shard_path(m, folder), _signature(shard_path(m, folder))) for m in chosen], len(available) - len(chosen)
+
+def load_trends_view(months: int = None, folder: str = TRENDS_DIR, legacy_path: str = LEGACY_TRENDS_PATH,
+                     snapshot_path: str = SNAPSHOT_PATH) -> dict:
+    """
+    {"all": [...], "by_category": {categoría: [...]}, "older_months": n}, ordenado por
+    `published` (más reciente primero), con los `months` shards más recientes.
+    `older_months` dice cuántos meses más hay para "cargar anteriores".
+    Si la instantánea del colector cubre esa ventana y está al día con el manifest,
+    sale de ella (una lectura); si no, de los shards.
+    Compartido entre reruns y sesiones: solo se parsea un shard cuando cambia su mtime/tamaño.
+    Las listas son de solo lectura para quien las consume.
+    """
+    months = months or default_months()
+    with _LOCK:
+        manifest = _manifest(folder)
+        snapshot = _snapshot_view(snapshot_path) if manifest is not None else None
+        if (snapshot is not None and snapshot["months"] == months
+                and snapshot["data_version"] == window_version(manifest, months)):
+            return snapshot
+        window, older = _window(folder, legacy_path, months)
+        sig = (tuple(window), older)
+        if sig != _CACHE["signature"] or _CACHE["view"] is None:
+            items = []
+            for path, shard_sig in reversed(window):  # del más antiguo al más reciente, como el fichero único
+                items.extend(_read_shard(path, shard_sig))
+            view = _build_view(items)
+            view["older_months"] = older
+            _CACHE["view"] = view
+            _CACHE["signature"] = sig
+        return _CACHE["view"]
+
+def articles_for(category: str, months: int = None) -> list:
+    view = load_trends_view(months)
+    c = (category or "todas").lower()
+    if c == "todas":
+        return view["all"]
+    return view["by_category"].get(c, [])
+
+def older_months(months: int = None) -> int:
+    return load_trends_view(months)["older_months"]
+
+# ─────────────────────────────────────────────────────────────
+# Instantánea para el dashboard (data/dashboard_snapshot.json.gz)
+# ─────────────────────────────────────────────────────────────
+# La escribe el colector al final de cada ejecución: la vista de los `months` shards más
+# recientes ya deduplicada y ordenada, solo con los campos de la tarjeta (sin el HTML de
+# `summary`), en filas agrupadas por categoría:
+#   {"version", "generated_at", "data_version", "window", "months": [...], "older_months",
+#    "fields": [...], "rows": [[...], ...], "categories": {cat: [inicio, fin]}, "order": [fila, ...]}
+# `window` es el `months` pedido (puede haber menos shards); `order` es el orden de "todas". `data_version` = window_version() del manifest al escribirla:
+# si los shards cambian después (backfills, reprocesos), el dashboard vuelve a los shards.
+
+def _card_row(article: dict) -> list:
+    img_url, snippet = render_fields(article)
+    values = {**article, "image_url": img_url, "snippet": snippet}
+    return [values.get(f) for f in SNAPSHOT_FIELDS]
+
+def write_dashboard_snapshot(months: int = None, folder: str = TRENDS_DIR, path: str = SNAPSHOT_PATH):
+    """Escribe la instantánea (temporal + rename). Devuelve cuántos artículos lleva; None sin manifest."""
+    months = months or default_months()
+    manifest = load_manifest(folder)
+    if manifest is None:
+        return None
+    available = hot_months(manifest)
+    chosen = available[:months]
+    items = []
+    for month in reversed(chosen):
+        data = read_json(shard_path(month, folder), default=[])
+        items.extend(data if isinstance(data, list) else [])
+    view = _build_view(items)
+    rows, categories, row_of = [], {}, {}
+    for cat in sorted(view["by_category"]):
+        start = len(rows)
+        for a in view["by_category"][cat]:
+            row_of[id(a)] = len(rows)
+            rows.append(_card_row(a))
+        categories[cat] = [start, len(rows)]
+    atomic_write_json_gz(path, {
+        "version": SNAPSHOT_VERSION,
+        "generated_at": now_iso(),
+        "data_version": window_version(manifest, months),
+        "window": months,
+        "months": chosen,
+        "older_months": len(available) - len(chosen),
+        "fields": list(SNAPSHOT_FIELDS),
+        "rows": rows,
+        "categories": categories,
+        "order": [row_of[id(a)] for a in view["all"]],
+    })
+    return len(rows)
+
+def _decode_snapshot(data) -> dict:
+    fields = data["fields"]
+    articles = [{k: v for k, v in zip(fields, row) if v is not None} for row in data["rows"]]
+    return {
+        "all": [articles[i] for i in data["order"]],
+        "by_category": {cat: articles[start:end] for cat, (start, end) in data["categories"].items()},
+        "older_months": int(data.get("older_months") or 0),
+        "months": int(data["window"]),
+        "data_version": data.get("data_version"),
+    }
+
+def _snapshot_view(path):
+    """Vista decodificada de la instantánea; se relee solo si cambia el fichero. None si no sirve."""
+    sig = (path, _signature(path))
+    if sig != _SNAPSHOT["signature"]:
+        view = None
+        data = read_json_gz(path, default=None) if sig[1] else None
+        if isinstance(data, dict) and data.get("version") == SNAPSHOT_VERSION:
+            try:
+                view = _decode_snapshot(data)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                print(f"[!] Instantánea del dashboard ilegible ({path}): {e}", flush=True)
+        _SNAPSHOT["view"] = view
+        _SNAPSHOT["signature"] = sig
+    return _SNAPSHOT["view"]
+
+# ─────────────────────────────────────────────────────────────
+# Búsqueda (índice BM25 que mantiene el colector; se relee solo si cambia)
+# ─────────────────────────────────────────────────────────────
+def _search_index(path):
+    sig = (path, _signature(path))
+    if sig != _SEARCH["signature"] or _SEARCH["index"] is None:
+        _SEARCH["index"] = SearchIndex(path if sig[1] else None)
+        _SEARCH["signature"] = sig
+    return _SEARCH["index"]
+
+def _shard_by_id(path):
+    sig = _signature(path)
+    cached = _BY_ID.get(path)
+    if cached and cached[0] == sig:
+        return cached[1]
+    by_id = {a.get("id"): a for a in _read_shard(path, sig) if isinstance(a, dict)}
+    _BY_ID[path] = (sig, by_id)
+    return by_id
+
+def search_articles(query: str, category: str = "todas", limit: int = 50,
+                    folder: str = TRENDS_DIR, legacy_path: str = LEGACY_TRENDS_PATH,
+                    index_path: str = SEARCH_INDEX_PATH) -> list:
+    """
+    Artículos que encajan con `query` (sin tildes, stemming ES/EN, BM25), del más
+    al menos relevante; incluye el histórico archivado. Solo se leen los shards
+    de los meses que aparecen en los resultados.
+    """
+    c = (category or "todas").lower()
+    with _LOCK:
+        hits = _search_index(index_path).search(query, limit=limit if c == "todas" else limit * 4)
+        manifest = _manifest(folder)
+        out = []
+        for art_id, month, _ in hits:
+            if manifest is None:
+                paths = [legacy_path]
+            else:
+                paths = [shard_path(month, folder), shard_path(month, folder, archived=True)]
+            art = None
+            for p in paths:
+                art = _shard_by_id(p).get(art_id)
+                if art is not None:
+                    break
+            if art is None or (c != "todas" and (art.get("category") or "").lower() != c):
+                continue
+            out.append(art)
+            if len(out) >= limit:
+                break
+        return out
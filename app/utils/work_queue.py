@@ -0,0 +1,137 @@
+import os
+import time
+from app.utils.jsonio import read_json, atomic_write_json
+from app.utils.dates import published_ts
+
+DATA_DIR = "data"
+QUEUE_PATH = os.path.join(DATA_DIR, "collector_queue.json")
+
+# Vida media de la prioridad por antigüedad: una noticia de hace 2 días vale la mitad
+RECENCY_HALF_LIFE_H = 48.0
+# Suelo para que lo que el prefiltro ve poco probable siga ordenado por fecha
+_MIN_RELEVANCE = 0.05
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+def budget_seconds() -> float:
+    """Tiempo de pared para evaluar (COLLECTOR_BUDGET_MINUTES; 0 = sin límite)."""
+    return max(0.0, _env_float("COLLECTOR_BUDGET_MINUTES", 0) * 60.0)
+
+def queue_max_age_days() -> float:
+    """Lo que lleva más de N días en cola (COLLECTOR_QUEUE_MAX_DAYS, 7) ya no es tendencia: se descarta."""
+    return max(0.0, _env_float("COLLECTOR_QUEUE_MAX_DAYS", 7))
+
+def queue_max_items() -> int:
+    return max(0, int(_env_float("COLLECTOR_QUEUE_MAX_ITEMS", 1000)))
+
+class Deadline:
+    """Fin del presupuesto de tiempo (monótono); sin presupuesto nunca vence."""
+
+    def __init__(self, seconds: float, start: float = None):
+        start = time.monotonic() if start is None else start
+        self.end = start + seconds if seconds > 0 else None
+
+    def remaining(self):
+        return None if self.end is None else max(0.0, self.end - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.end is not None and time.monotonic() >= self.end
+
+# ─────────────────────────────────────────────────────────────
+# Cola persistente: lo que no se evaluó en esta ejecución se retoma en la siguiente
+# ─────────────────────────────────────────────────────────────
+def load_queue(path: str = QUEUE_PATH, now: float = None) -> list:
+    """Artículos pendientes de ejecuciones anteriores (sin los que ya son demasiado viejos)."""
+    data = read_json(path, default={})
+    items = data.get("items") if isinstance(data, dict) else None
+    now = time.time() if now is None else now
+    max_age = queue_max_age_days() * 86400
+    out = []
+    for a in items or []:
+        if not isinstance(a, dict):
+            continue
+        ts = published_ts(a) or float(a.get("queued_at") or 0)
+        if max_age and ts and now - ts > max_age:
+            continue
+        out.append(a)
+    return out
+
+def save_queue(articles, path: str = QUEUE_PATH, reason: str = ""):
+    now = time.time()
+    items = []
+    for a in list(articles)[:queue_max_items() or None]:
+        a = dict(a)
+        a.setdefault("queued_at", now)
+        a.pop("decided_by", None)  # el prefiltro se vuelve a aplicar (puede haber modelo nuevo)
+        items.append(a)
+    atomic_write_json(path, {
+        "saved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+        "reason": reason,
+        "items": items,
+    }, indent=None)
+    return len(items)
+
+# ─────────────────────────────────────────────────────────────
+# Prioridad, reparto entre categorías y plan según cuota/tiempo
+# ─────────────────────────────────────────────────────────────
+def priority(article: dict, p_relevant: float, now: float = None) -> float:
+    """Relevancia esperada × frescura (vida media RECENCY_HALF_LIFE_H)."""
+    now = time.time() if now is None else now
+    ts = published_ts(article) or float(article.get("queued_at") or now)
+    age_h = max(0.0, (now - ts) / 3600.0)
+    return max(p_relevant, _MIN_RELEVANCE) * 0.5 ** (age_h / RECENCY_HALF_LIFE_H)
+
+def fair_order(entries: list) -> list:
+    """
+    entries: [(prioridad, categoría, x)]. Orden por prioridad con reparto justo:
+    cada elemento ya elegido de una categoría divide la prioridad de la siguiente
+    de esa categoría (prioridad / (1 + elegidos)), así ninguna copa la cuota.
+    """
+    by_cat = {}
+    for prio, cat, x in entries:
+        by_cat.setdefault(cat, []).append((prio, x))
+    for items in by_cat.values():
+        items.sort(key=lambda e: e[0], reverse=True)
+    taken = {cat: 0 for cat in by_cat}
+    heads = {cat: 0 for cat in by_cat}
+    out = []
+    while True:
+        best, best_score = None, -1.0
+        for cat, items in by_cat.items():
+            if heads[cat] < len(items):
+                score = items[heads[cat]][0] / (1 + taken[cat])
+                if score > best_score:
+                    best, best_score = cat, score
+        if best is None:
+            return out
+        out.append(by_cat[best][heads[best]][1])
+        heads[best] += 1
+        taken[best] += 1
+
+def plan(ordered: list, cost, capacity_calls: float = None, max_items: int = None):
+    """
+    Recorre `ordered` (ya priorizado) y elige mientras quepa en `capacity_calls`
+    (coste esperado en llamadas, `cost(x)`) y en `max_items`.
+    Lo que no cuesta llamadas entra siempre. Devuelve (esta_ejecución, para_después).
+    """
+    selected, later = [], []
+    used = 0.0
+    picked = 0
+    for x in ordered:
+        c = cost(x)
+        if c <= 0:
+            selected.append(x)
+            continue
+        fits_quota = capacity_calls is None or used + c <= capacity_calls
+        fits_count = not max_items or picked < max_items
+        if fits_quota and fits_count:
+            selected.append(x)
+            used += c
+            picked += 1
+        else:
+            later.append(x)
+    return selected, later
@@ -0,0 +1,38 @@
+"""
+Backfill puntual: añade image_url / clean_text / snippet a las entradas
+antiguas de data/trends/ (shards calientes) y data/saved.json que aún no los tienen.
+
+    python backfill_card_fields.py           # solo las que faltan
+    python backfill_card_fields.py --force   # recalcula todas
+    python backfill_card_fields.py --thumbs  # además, miniaturas locales (static/thumbs) de las que no tengan
+"""
+import sys
+from app.utils.collector_store import CollectorStore
+from app.utils.card_fields import add_card_fields
+from app.utils.thumbs import add_thumbnail
+from app.utils.storage import update_saved
+from app.utils.trends_view import write_dashboard_snapshot
+
+force = "--force" in sys.argv[1:]
+thumbs = "--thumbs" in sys.argv[1:]
+
+def _backfill(article):
+    changed = add_card_fields(article, force=force)
+    if thumbs:
+        changed = add_thumbnail(article) or changed
+    return changed
+
+store = CollectorStore()
+changed_trends = 0
+for month in store.shards.months():
+    changed = sum(1 for a in store.shards.load(month) if _backfill(a))
+    if changed:
+        store.shards.mark_dirty(month)
+        changed_trends += changed
+if changed_trends:
+    store.compact()
+    write_dashboard_snapshot()
+print(f"[✓] data/trends/: {changed_trends}/{store.trend_count()} actualizadas", flush=True)
+
+changed_saved = update_saved(_backfill)
+print(f"[✓] saved.json: {changed_saved} actualizadas", flush=True)
@@ -0,0 +1,167 @@
+"""
+Benchmark del colector sin red: feeds locales (file://) + Gemini simulado.
+
+    python bench_collector.py                          # 5 categorías × 24 artículos, 3 claves
+    python bench_collector.py --keys 1 --rpm 5         # una sola clave
+    python bench_collector.py --single-pass --json out.json
+
+Lanza trend_probe.py completo en un directorio temporal con AURA_LLM_BACKEND=fake
+y reporta artículos/minuto, llamadas por artículo, 429/503 y tiempo de hilo
+ocupado (latencia del modelo) frente a esperando (ritmo, backoff), leído de
+data/run_metrics.json del propio colector.
+Para que sea rápido, la ventana de cuota se comprime (--window, 60s reales por defecto → 6s).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from email.utils import formatdate
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_WORDS = (
+    "málaga festival chef estrella michelin apertura hotel diseño arte museo picasso moda desfile "
+    "colección terraza vino bodega mercado costa playa wellness spa concierto exposición galería "
+    "joyería perfume temporada verano otoño ruta tapas cocina tendencia lujo marca artista cine "
+    "arquitectura jardín yate golf sol noche cóctel azotea boutique artesanía flamenco teatro"
+).split()
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+def _write_feed(path, category, n, start_ts):
+    rng = random.Random(f"{category}-{n}")
+    items = []
+    for i in range(n):
+        # Texto distinto por noticia: si no, el detector de duplicados las fusiona
+        title = f"{_sentence(rng, 6).capitalize()} ({category} {i})"
+        summary = (f'<div><img src="https://example.invalid/{category}/{i}.jpg" style="width: 100%;" />'
+                   f"<div>{_sentence(rng, 40).capitalize()}.</div></div>")
+        items.append(
+            "<item>"
+            f"<title>{title}</title>"
+            f"<link>https://example.invalid/{category}/{i}</link>"
+            f"<guid>bench-{category}-{i}</guid>"
+            f"<pubDate>{formatdate(start_ts - i * 600, usegmt=True)}</pubDate>"
+            f"<description><![CDATA[{summary}]]></description>"
+            "</item>"
+        )
+    xml = ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+           f"<title>{category}</title><link>https://example.invalid/</link><description>bench</description>"
+           + "".join(items) + "</channel></rss>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(xml)
+
+def _prepare(workdir, categories, per_category):
+    os.makedirs(os.path.join(workdir, "config"), exist_ok=True)
+    os.makedirs(os.path.join(workdir, "feeds"), exist_ok=True)
+    now = time.time()
+    lines = ["feeds:"]
+    for c in range(categories):
+        cat = f"cat{c}"
+        path = os.path.join(workdir, "feeds", f"{cat}.xml")
+        _write_feed(path, cat, per_category, now)
+        lines += [f"  {cat}:", f"    - file://{path}"]
+    with open(os.path.join(workdir, "config", "feeds.yaml"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="aura-bench-")
+    _prepare(workdir, args.categories, args.per_category)
+    keys = [f"bench-key-{i}" for i in range(args.keys)]
+    stats_path = os.path.join(workdir, "fake_stats.json")
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "AURA_LLM_BACKEND": "fake",
+        "AURA_FAKE_STATS": stats_path,
+        "AURA_FAKE_LATENCY": str(args.latency),
+        "AURA_FAKE_RPM": str(args.rpm),
+        "AURA_FAKE_WINDOW": str(args.window),
+        "AURA_FAKE_503_RATE": str(args.rate_503),
+        "AURA_FAKE_BAD_ENRICH_RATE": str(args.bad_enrich_rate),
+        "AURA_FAKE_INVALID_KEYS": ",".join(keys[:args.invalid_keys]),
+        "GEMINI_API_KEYS": ",".join(keys),
+        "GEMINI_API_KEY": "",
+        "GEMINI_SECONDS_PER_CALL": str(args.window / args.rpm),
+        "GEMINI_RPM_PER_KEY": "",
+        "GEMINI_BATCH_SIZE": str(args.batch_size),
+        "GEMINI_SINGLE_PASS": "1" if args.single_pass else "",
+        "GEMINI_CACHE_BYPASS": "1",
+        "PER_CATEGORY_LIMIT": str(args.per_category),
+        "MAX_TOTAL_ARTICLES": str(args.categories * args.per_category),
+        "PREFILTER_ENABLED": "0",
+    })
+    t0 = time.monotonic()
+    proc = subprocess.run([sys.executable, os.path.join(REPO_ROOT, "trend_probe.py")],
+                          cwd=workdir, env=env, capture_output=True, text=True)
+    wall = time.monotonic() - t0
+    if proc.returncode != 0:
+        print(proc.stdout[-4000:], proc.stderr[-4000:], sep="\n")
+        raise SystemExit(f"[❌] trend_probe.py terminó con código {proc.returncode}")
+    if args.verbose:
+        print(proc.stdout)
+
+    with open(os.path.join(workdir, "data", "curated.json"), encoding="utf-8") as f:
+        processed = len(json.load(f))
+    with open(stats_path, encoding="utf-8") as f:
+        fake = json.load(f)
+    # Tiempos por etapa/clave desde las métricas del propio colector
+    with open(os.path.join(workdir, "data", "run_metrics.json"), encoding="utf-8") as f:
+        metrics = json.load(f)
+    hist = metrics.get("histograms", {})
+    sum_s = lambda name: hist.get(name, {}).get("sum_s", 0.0)
+    report = {
+        "articles": processed,
+        "wall_s": round(wall, 2),
+        "articles_per_min": round(processed / wall * 60, 1) if wall else 0.0,
+        "calls": fake["calls"],
+        "calls_per_article": round(fake["calls"] / processed, 3) if processed else None,
+        "errors": {k: fake[k] for k in ("429_minute", "429_day", "503", "invalid")},
+        "tokens_per_article": round((fake["tokens_in"] + fake["tokens_out"]) / processed, 1) if processed else None,
+        "thread_busy_s": round(sum_s("gemini.call"), 2),
+        "thread_waiting_s": {"pace": round(sum_s("gemini.wait_pace"), 2),
+                             "backoff": round(sum_s("gemini.wait_backoff"), 2)},
+        "enrich": {k.split(".", 1)[1]: v for k, v in metrics.get("counters", {}).items() if k.startswith("enrich.")},
+        "stages_s": {k: v["sum_s"] for k, v in hist.items() if k.startswith("stage.")},
+        "gemini_call_p95_s": hist.get("gemini.call", {}).get("p95_s"),
+        "calls_by_key": fake["by_key"],
+        "config": vars(args),
+        "workdir": workdir,
+    }
+    return report
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark offline del colector")
+    p.add_argument("--categories", type=int, default=5)
+    p.add_argument("--per-category", type=int, default=24)
+    p.add_argument("--keys", type=int, default=3)
+    p.add_argument("--invalid-keys", type=int, default=0, help="cuántas de las claves simulan estar caducadas")
+    p.add_argument("--rpm", type=int, default=5, help="llamadas por clave y ventana")
+    p.add_argument("--window", type=float, default=6.0, help="ventana de cuota simulada (s); la real es 60")
+    p.add_argument("--latency", type=float, default=0.05, help="latencia simulada por llamada (s)")
+    p.add_argument("--rate-503", type=float, default=0.0)
+    p.add_argument("--bad-enrich-rate", type=float, default=0.0, help="enriquecimientos fuera de formato")
+    p.add_argument("--batch-size", type=int, default=10)
+    p.add_argument("--single-pass", action="store_true")
+    p.add_argument("--min-apm", type=float, default=None, help="falla si artículos/minuto queda por debajo")
+    p.add_argument("--json", default=None, help="guardar el informe en este fichero")
+    p.add_argument("--verbose", action="store_true", help="mostrar la salida del colector")
+    args = p.parse_args(argv)
+
+    report = run(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.min_apm is not None and report["articles_per_min"] < args.min_apm:
+        print(f"[❌] Throughput {report['articles_per_min']} art/min < {args.min_apm}", flush=True)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
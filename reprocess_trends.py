@@ -0,0 +1,155 @@
+"""
+Reprocesa las relevantes decididas o enriquecidas con prompts anteriores
+(relevance_version / enrich_version distintas de las de app/utils/ai_filter.py).
+Orden: guardadas primero y después las más recientes. Usa los mismos lotes,
+claves y ritmo que el colector y se corta al llegar al tope de llamadas.
+Reanudable: cada noticia se sella con la versión nueva al terminar (y pasa por el
+diario del store), así que la siguiente ejecución sigue donde lo dejó esta.
+
+    python reprocess_trends.py                  # hasta REPROCESS_MAX_CALLS llamadas (100)
+    python reprocess_trends.py --max-calls 30
+    python reprocess_trends.py --enrich-only    # no reevalúa la relevancia
+    python reprocess_trends.py --include-prefilter  # reevalúa también lo decidido por el prefiltro
+    python reprocess_trends.py --dry-run        # solo cuenta lo desfasado
+"""
+import os
+import argparse
+from google.api_core.exceptions import ResourceExhausted
+from app.utils.ai_filter import (classify_batch, enrich_article_fields, apply_enrichment, batch_size, call_capacity,
+                                 GenerationError, RELEVANCE_VERSION, ENRICH_VERSION, ENRICH_MAX_ATTEMPTS)
+from app.utils.collector_store import CollectorStore
+from app.utils.run_metrics import METRICS
+from app.utils.storage import get_saved, update_saved
+from app.utils.dates import published_ts
+from app.utils.prefilter import decided_by_prefilter
+from app.utils.trends_view import write_dashboard_snapshot
+
+# Lo que se copia a saved.json (las guardadas son copias de la tarjeta)
+_REPROCESSED_FIELDS = ("why_it_matters", "activation_ideas", "relevance_version", "enrich_version",
+                       "needs_enrichment", "enrich_attempts")
+
+def _calls() -> int:
+    return METRICS.counters.get("gemini.calls", 0)
+
+def _budget(max_calls: int) -> int:
+    left = call_capacity()["calls_left_today"]
+    return max_calls if left is None else min(max_calls, left)
+
+def _ordered(trends, saved_ids) -> list:
+    return sorted(trends, key=lambda a: (a.get("id") in saved_ids, published_ts(a) or 0.0), reverse=True)
+
+def _stale_enrichment(trends) -> list:
+    return [a for a in trends
+            if a.get("enrich_version") != ENRICH_VERSION and int(a.get("enrich_attempts") or 0) < ENRICH_MAX_ATTEMPTS]
+
+def _stale_relevance(trends, include_prefilter: bool) -> list:
+    # El prefiltro no usa el prompt: sus veredictos (relevance_version "prefilter-…")
+    # solo se rehacen si se pide
+    return [a for a in trends if a.get("relevance_version") != RELEVANCE_VERSION
+            and (include_prefilter or not decided_by_prefilter(a))]
+
+def _recheck_relevance(store, stale, saved_ids, budget, updated):
+    """Una llamada por lote. Devuelve (descartadas, motivo de corte|None)."""
+    demoted = 0
+    size = batch_size()
+    for start in range(0, len(stale), size):
+        if _calls() >= budget:
+            return demoted, "budget"
+        chunk = stale[start:start + size]
+        try:
+            verdicts = classify_batch(chunk, size=size)
+        except ResourceExhausted as e:
+            print(f"[⛔] Sin cuota: {e}", flush=True)
+            return demoted, "quota_exhausted"
+        except GenerationError as e:
+            print(f"[!] Lote no reevaluado: {e}", flush=True)
+            continue
+        for a in chunk:
+            if a["id"] not in verdicts:
+                continue
+            art = dict(a, relevance_version=RELEVANCE_VERSION)
+            art.pop("decided_by", None)  # ahora lo ha decidido Gemini
+            # Las guardadas se quedan aunque el criterio nuevo las descarte
+            if verdicts[a["id"]] or a["id"] in saved_ids:
+                store.update_trend(art)
+                updated[art["id"]] = art
+            else:
+                store.demote_trend(art)
+                updated.pop(art["id"], None)
+                demoted += 1
+    return demoted, None
+
+def _reenrich(store, stale, budget, updated):
+    """Una llamada por noticia (+ la reparación si hace falta). Devuelve (completas, motivo de corte|None)."""
+    done = 0
+    for a in stale:
+        if _calls() >= budget:
+            return done, "budget"
+        art = dict(a)
+        try:
+            enrich = enrich_article_fields(art)
+        except ResourceExhausted as e:
+            print(f"[⛔] Sin cuota: {e}", flush=True)
+            return done, "quota_exhausted"
+        except GenerationError as e:
+            print(f"[!] Enriquecimiento fallido ({art['id']}): {e}", flush=True)
+            enrich = {"needs_enrichment": True}
+        # Si falla, se conservan why/ideas anteriores y queda needs_enrichment
+        done += apply_enrichment(art, enrich)
+        store.update_trend(art)
+        updated[art["id"]] = art
+    return done, None
+
+def _sync_saved(updated) -> int:
+    def transform(article):
+        new = updated.get(article.get("id"))
+        if new is None:
+            return False
+        for k in _REPROCESSED_FIELDS:
+            if k in new:
+                article[k] = new[k]
+            else:
+                article.pop(k, None)
+        return True
+    return update_saved(transform)
+
+def main():
+    p = argparse.ArgumentParser(description="Reprocesa relevantes con prompts desfasados")
+    p.add_argument("--max-calls", type=int, default=int(os.getenv("REPROCESS_MAX_CALLS", "100")),
+                   help="tope de llamadas a Gemini en esta ejecución")
+    p.add_argument("--enrich-only", action="store_true", help="no reevalúa la relevancia")
+    p.add_argument("--include-prefilter", action="store_true",
+                   help="reevalúa con Gemini también lo decidido por el prefiltro local")
+    p.add_argument("--dry-run", action="store_true")
+    args = p.parse_args()
+
+    store = CollectorStore()
+    saved_ids = {a.get("id") for a in get_saved()}
+    trends = _ordered(store.all_trends(), saved_ids)
+    stale_rel = [] if args.enrich_only else _stale_relevance(trends, args.include_prefilter)
+    print(f"[+] Versiones actuales: relevancia {RELEVANCE_VERSION}, enriquecimiento {ENRICH_VERSION}", flush=True)
+    print(f"[+] Desfasadas: {len(stale_rel)} por relevancia, {len(_stale_enrichment(trends))} por enriquecimiento "
+          f"(de {len(trends)} en caliente)", flush=True)
+    if args.dry_run or args.max_calls <= 0:
+        return
+
+    budget = _budget(args.max_calls)
+    print(f"[+] Tope de esta ejecución: {budget} llamadas", flush=True)
+    updated = {}
+    demoted, stop = _recheck_relevance(store, stale_rel, saved_ids, budget, updated)
+    enriched = 0
+    if stop is None:
+        # Se vuelve a leer: las descartadas ya no están y las reevaluadas traen su sello nuevo
+        stale_enr = _stale_enrichment(_ordered(store.all_trends(), saved_ids))
+        enriched, stop = _reenrich(store, stale_enr, budget, updated)
+    store.compact()
+    if updated or demoted:
+        write_dashboard_snapshot()
+    synced = _sync_saved(updated)
+
+    print(f"[✓] Reprocesadas: {len(updated)} actualizadas ({enriched} reenriquecidas), {demoted} descartadas, "
+          f"{synced} guardadas sincronizadas. {'Corte: ' + stop if stop else 'Nada pendiente.'}", flush=True)
+    print(f"[ℹ] {METRICS.summary()}", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los scripts se lanzan desde la raíz del repo (import app.…): igual aquí
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+import json
+import pytest
+from app.utils import ai_filter
+from app.utils.key_ledger import KeyLedger
+from app.utils.key_pool import KeyPool
+from app.utils.llm_cache import ResponseCache
+
+ARTICLE = {"id": "a1", "title": "Nueva ruta gastronómica en Málaga", "summary": "Restaurantes con estrella."}
+GOOD_ENRICH = {
+    "why_it_matters": "Málaga suma una ruta gastronómica con estrella, ideal para huéspedes que buscan experiencias.",
+    "activation_ideas": ["Recomendar la ruta al llegar", "Reservar mesa para huéspedes", "Sugerir maridajes locales"],
+}
+
+class StubBackend:
+    """Devuelve las respuestas en orden y cuenta las llamadas reales."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def generate(self, key, model_name, prompt, schema=None):
+        self.calls += 1
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        return reply, {}
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    def install(replies):
+        backend = StubBackend(replies)
+        monkeypatch.setattr(ai_filter, "_BACKEND", backend)
+        monkeypatch.setattr(ai_filter, "_API_KEYS", ["k1"])
+        monkeypatch.setattr(ai_filter, "_CACHE", ResponseCache(folder=str(tmp_path / "cache"), bypass=False))
+        monkeypatch.setattr(ai_filter, "_POOL", KeyPool(["k1"], 0.0, ledger=KeyLedger(str(tmp_path / "ledger.json"))))
+        return backend
+    return install
+
+def test_rejected_relevance_reply_is_not_replayed(stub):
+    backend = stub(["maybe"])
+    for _ in range(2):
+        with pytest.raises(ai_filter.GenerationError):
+            ai_filter.is_relevant_for_aura(ARTICLE)
+    assert backend.calls == 2
+
+def test_accepted_relevance_reply_is_cached(stub):
+    backend = stub(["true"])
+    assert ai_filter.is_relevant_for_aura(ARTICLE) is True
+    assert ai_filter.is_relevant_for_aura(ARTICLE) is True
+    assert backend.calls == 1
+
+def test_enrichment_retry_reaches_the_model(stub):
+    backend = stub([json.dumps({"why_it_matters": "corto", "activation_ideas": []})])
+    assert ai_filter.enrich_article_fields(ARTICLE).get("needs_enrichment")
+    first = backend.calls  # respuesta + reparación
+    assert first == 2
+    ai_filter.enrich_article_fields(ARTICLE)
+    assert backend.calls == 2 * first
+
+def test_retry_after_bad_reply_gets_the_fixed_one(stub):
+    backend = stub([json.dumps({"why_it_matters": "corto"}), "{}", json.dumps(GOOD_ENRICH)])
+    assert ai_filter.enrich_article_fields(ARTICLE).get("needs_enrichment")
+    assert ai_filter.enrich_article_fields(ARTICLE) == GOOD_ENRICH
+    assert backend.calls == 3
@@ -0,0 +1,14 @@
+from app.utils.llm_cache import ResponseCache
+
+def test_discard_turns_next_lookup_into_miss(tmp_path):
+    cache = ResponseCache(folder=str(tmp_path), bypass=False)
+    cache.put("m", "prompt", "respuesta rechazada")
+    assert cache.get("m", "prompt") == "respuesta rechazada"
+
+    assert cache.discard("m", "prompt") is True
+    assert cache.get("m", "prompt") is None
+    assert cache.stats["discards"] == 1
+    # Otra entrada no se ve afectada; descartar lo que no existe no falla
+    cache.put("m", "otro", "ok")
+    assert cache.discard("m", "prompt") is False
+    assert cache.get("m", "otro") == "ok"
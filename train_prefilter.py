@@ -0,0 +1,83 @@
+"""
+Prefiltro local de relevancia (ver app/utils/prefilter.py).
+
+    python train_prefilter.py train   # entrena con el histórico y, si pasa la puerta, guarda data/prefilter_model.npz
+    python train_prefilter.py eval    # evalúa el modelo guardado contra los veredictos reservados
+
+Los veredictos de Gemini (curated.json) son las etiquetas; el texto sale de
+data/trends/ (relevantes, archivo incluido) y rejected.jsonl (descartadas). Un 20% de ids, elegido
+por hash, nunca se usa para entrenar y sirve para medir precision/recall.
+El modelo nuevo solo sustituye al guardado si en esos reservados pasa la puerta de
+promoción (prefilter.promotion_problems); si no, se conserva el anterior.
+Datos insuficientes y modelo no promocionado son estados normales (las primeras semanas):
+salen con código 0 y una línea de log. Código distinto de 0 solo para errores de verdad.
+"""
+import sys
+import json
+import argparse
+from app.utils.collector_store import CollectorStore, load_rejected
+from app.utils import prefilter as pf
+
+def _split():
+    store = CollectorStore()
+    samples = pf.labeled_samples(store.curated, store.all_trends(include_archived=True), load_rejected())
+    train = [s for s in samples if not pf.is_holdout(s[0].get("id"))]
+    held = [s for s in samples if pf.is_holdout(s[0].get("id"))]
+    return train, held
+
+def _report(title, metrics):
+    print(f"[ℹ] {title}: {json.dumps(metrics, ensure_ascii=False, indent=2)}", flush=True)
+
+def cmd_train(args):
+    train, held = _split()
+    n_pos = sum(1 for _, y in train if y)
+    if n_pos < args.min_per_class or len(train) - n_pos < args.min_per_class:
+        print(f"[ℹ] Sin reentrenar, datos insuficientes: {n_pos} positivos / {len(train) - n_pos} negativos "
+              f"(mínimo {args.min_per_class} de cada). Deja que el colector acumule descartadas.", flush=True)
+        return 0
+    print(f"[+] Entrenando con {len(train)} ejemplos ({n_pos} relevantes); reservados: {len(held)}", flush=True)
+    model = pf.train(train, epochs=args.epochs)
+    metrics = pf.evaluate(model, held) if held else {"n": 0}
+    model["meta"]["holdout"] = metrics
+    _report("Evaluación (reservados)", metrics)
+    problems = pf.promotion_problems(metrics, args.min_holdout, args.max_missed, args.min_precision)
+    if problems:
+        # El colector seguiría usando este modelo para decidir sin Gemini: mejor el anterior
+        print(f"[ℹ] Modelo NO promocionado ({'; '.join(problems)}). Se conserva {pf.MODEL_PATH} anterior.",
+              flush=True)
+        return 0
+    pf.save_model(model)
+    print(f"[✅] Modelo guardado en {pf.MODEL_PATH}", flush=True)
+    return 0
+
+def cmd_eval(args):
+    model = pf.load_model()
+    if model is None:
+        print(f"[❌] No hay modelo en {pf.MODEL_PATH} (o PREFILTER_ENABLED=0). Ejecuta 'train' primero.", flush=True)
+        return 1
+    _, held = _split()
+    _report("Evaluación (reservados)", pf.evaluate(model, held, args.low, args.high))
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefiltro local de relevancia")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_train = sub.add_parser("train", help="entrenar y guardar el modelo")
+    p_train.add_argument("--epochs", type=int, default=25)
+    p_train.add_argument("--min-per-class", type=int, default=20)
+    p_train.add_argument("--min-holdout", type=int, default=None,
+                         help="reservados mínimos para promocionar (def. PREFILTER_GATE_MIN_HOLDOUT)")
+    p_train.add_argument("--max-missed", type=int, default=None,
+                         help="relevantes descartadas sin Gemini toleradas (def. PREFILTER_GATE_MAX_MISSED)")
+    p_train.add_argument("--min-precision", type=float, default=None,
+                         help="precisión mínima al aceptar sin Gemini (def. PREFILTER_GATE_MIN_PRECISION)")
+    p_train.set_defaults(func=cmd_train)
+    p_eval = sub.add_parser("eval", help="evaluar el modelo guardado")
+    p_eval.add_argument("--low", type=float, default=None, help="umbral de descarte (def. PREFILTER_LOW)")
+    p_eval.add_argument("--high", type=float, default=None, help="umbral de aceptación (def. PREFILTER_HIGH)")
+    p_eval.set_defaults(func=cmd_eval)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
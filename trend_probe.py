@@ -1,49 +1,42 @@
 import os
 import sys
-import json
-from app.utils.parser import load_feeds, fetch_articles_from_feeds
-from app.utils.ai_filter import is_relevant_for_aura, enrich_article_fields
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app.utils.parser import load_feeds, fetch_articles_from_feeds, load_feed_state, save_feed_state
+from app.utils.collector_store import CollectorStore, load_rejected
+from app.utils.dedupe import DedupeIndex
+from app.utils.card_fields import add_card_fields
+from app.utils.thumbs import add_thumbnail, prune_thumbnails
+from app.utils.prefilter import load_model, predict_proba, verdict_for_proba
+from app.utils.ai_filter import (classify_batch, classify_and_enrich, enrich_article_fields, batch_size, key_count,
+                                  cache_summary, call_capacity, GenerationError, apply_enrichment,
+                                  RELEVANCE_VERSION, ENRICH_MAX_ATTEMPTS)
+from app.utils.run_metrics import METRICS
+from app.utils.storage import get_saved
+from app.utils.work_queue import Deadline, budget_seconds, load_queue, save_queue, priority, fair_order, plan
+from app.utils.trends_view import write_dashboard_snapshot
 from google.api_core.exceptions import ResourceExhausted
 
 DATA_DIR = "data"
-CURATED_PATH = os.path.join(DATA_DIR, "curated.json")
-TRENDS_PATH  = os.path.join(DATA_DIR, "trends.json")
 
 # Límites por entorno (con defaults prudentes)
 PER_CATEGORY_LIMIT = int(os.getenv("PER_CATEGORY_LIMIT", "30"))
+# Máximo de artículos que se mandan a Gemini por ejecución; el resto queda en cola (data/collector_queue.json)
 MAX_TOTAL_ARTICLES = int(os.getenv("MAX_TOTAL_ARTICLES", "120"))
+BATCH_SIZE = batch_size()  # GEMINI_BATCH_SIZE: noticias por llamada de clasificación
+# GEMINI_SINGLE_PASS=1 → clasificar + enriquecer en una sola llamada por artículo
+SINGLE_PASS = os.getenv("GEMINI_SINGLE_PASS", "").strip().lower() in ("1", "true", "yes")
+# Hilos en paralelo (por defecto, uno por clave; el ritmo lo limita el cubo de cada clave)
+WORKERS = int(os.getenv("GEMINI_WORKERS", "0")) or max(1, key_count())
+# Compactar curated.json/shards de trends cada N artículos (0 = solo al final de la ejecución)
+STORE_COMPACT_EVERY = int(os.getenv("STORE_COMPACT_EVERY", "0"))
+# Relevantes con el enriquecimiento a medias (needs_enrichment) que se reintentan por ejecución
+ENRICH_RETRY_PER_RUN = int(os.getenv("ENRICH_RETRY_PER_RUN", "10"))
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def _read_json(path, default):
-    try:
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"[!] No pude leer {path}: {e} → reinicio formato.", flush=True)
-    return default
-
-def _save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def _normalize_curated(obj):
-    if isinstance(obj, dict):
-        return obj
-    if isinstance(obj, list):
-        out = {}
-        for item in obj:
-            if isinstance(item, str):
-                out[item] = False
-            elif isinstance(item, dict) and "id" in item:
-                val = item.get("relevante")
-                out[item["id"]] = bool(val) if isinstance(val, bool) else False
-        return out
-    return {}
-
-def _normalize_trends(obj):
-    return obj if isinstance(obj, list) else []
+# COLLECTOR_BUDGET_MINUTES: a partir de ahí no se lanzan lotes nuevos (lo pendiente queda en cola)
+deadline = Deadline(budget_seconds())
 
 print("🧪 GEMINI_API_KEY/GEMINI_API_KEYS presente:",
       any([os.getenv("GEMINI_API_KEY"), os.getenv("GEMINI_API_KEYS")]),
@@ -55,73 +48,326 @@ if not feeds_by_category:
     print("[❌] No hay feeds cargados. Revisa config/feeds.yaml (indentación y 'feeds:' en raíz).", flush=True)
     sys.exit(1)
 
-print(f"[+] Recogiendo artículos (por categoría: {PER_CATEGORY_LIMIT})…", flush=True)
-articles = fetch_articles_from_feeds(feeds_by_category, per_category=PER_CATEGORY_LIMIT)
+with METRICS.timer("stage.open_store"):
+    store = CollectorStore(compact_every=STORE_COMPACT_EVERY)
+curated = store.curated
+
+# Lo que quedó sin evaluar en ejecuciones anteriores va delante (los ya evaluados se saltan abajo)
+queued = load_queue()
+queued_ids = {a.get("id") for a in queued}
 
-# Limitar total si se desea
-if len(articles) > MAX_TOTAL_ARTICLES:
-    articles = articles[:MAX_TOTAL_ARTICLES]
+print(f"[+] Recogiendo artículos (por categoría: {PER_CATEGORY_LIMIT})…", flush=True)
+feed_state = load_feed_state()
+with METRICS.timer("stage.fetch_feeds"):
+    # Lo ya evaluado o en cola no ocupa hueco del tope por categoría
+    articles = fetch_articles_from_feeds(feeds_by_category, per_category=PER_CATEGORY_LIMIT, state=feed_state,
+                                         known=lambda art_id: art_id in curated or art_id in queued_ids)
+METRICS.incr("articles.fetched", len(articles))
 
 print(f"[+] Artículos obtenidos: {len(articles)}", flush=True)
 
-curated = _normalize_curated(_read_json(CURATED_PATH, default={}))
-trends  = _normalize_trends(_read_json(TRENDS_PATH,  default=[]))
+if queued:
+    print(f"[+] En cola de ejecuciones anteriores: {len(queued)}", flush=True)
+    METRICS.incr("articles.from_queue", len(queued))
+    articles = queued + articles
 
 procesados_nuevos = 0
 total = len(articles)
 
+# Historias ya vistas (URL canónica + SimHash); la primera vez se siembra con el histórico
+dedupe = DedupeIndex()
+if not len(dedupe):
+    for a in store.all_trends():
+        dedupe.add(a)
+    for a in load_rejected():
+        dedupe.add(a)
+
+def _run_config():
+    return {"batch_size": BATCH_SIZE, "single_pass": SINGLE_PASS, "workers": WORKERS,
+            "keys": key_count(), "per_category": PER_CATEGORY_LIMIT, "max_total": MAX_TOTAL_ARTICLES}
+
+def _write_metrics(outcome):
+    # data/run_metrics.json (+ una línea en el histórico): tiempos por etapa y por clave
+    METRICS.write(outcome=outcome, config=_run_config())
+    print(f"[ℹ] {METRICS.summary()}", flush=True)
+
+# Pendientes (sin evaluar y sin repetir id), con su posición para los logs
+pending = []
+seen_ids = set()
+dup_waiting = {}  # id original (pendiente en esta ejecución) → [(idx, duplicado)]
+_t_dedupe = time.monotonic()
 for idx, art in enumerate(articles, start=1):
     art_id = art.get("id") or art.get("link") or art.get("title")
     if not art_id:
         print(f"[{idx}/{total}] [!] Artículo sin ID/link/título. Saltado.", flush=True)
         continue
-    if art_id in curated:
+    if art_id in curated or art_id in seen_ids:
         print(f"[{idx}/{total}] [·] Ya evaluado: {art.get('title','Sin título')[:70]}", flush=True)
+        METRICS.incr("articles.already_seen")
         continue
+    art["id"] = art_id
+    # Imagen, texto limpio y snippet de la tarjeta: una vez aquí, no en cada rerun del dashboard
+    add_card_fields(art)
 
-    title = art.get("title", "Sin título")
-    print(f"[{idx}/{total}] [IA] Evaluando: {title[:90]}", flush=True)
+    # Misma historia en otro feed/categoría: hereda la decisión (y el enriquecimiento) del original
+    dup_of = dedupe.find(art)
+    if dup_of in curated:
+        store.record(art_id, curated[dup_of])
+        dedupe.add(art, dup_of)
+        print(f"[{idx}/{total}] [≈] Duplicado ya evaluado: {art.get('title','Sin título')[:70]}", flush=True)
+        METRICS.incr("articles.duplicate")
+        continue
+    if dup_of in seen_ids:
+        dup_waiting.setdefault(dup_of, []).append((idx, art))
+        dedupe.add(art, dup_of)
+        print(f"[{idx}/{total}] [≈] Duplicado en esta ejecución: {art.get('title','Sin título')[:70]}", flush=True)
+        METRICS.incr("articles.duplicate")
+        continue
+    dedupe.add(art)
 
-    try:
-        is_rel = is_relevant_for_aura(art)
-        curated[art_id] = bool(is_rel)
-        if is_rel:
-            # Enriquecer con Gemini (why + ideas)
-            enrich = {}
-            try:
+    seen_ids.add(art_id)
+    pending.append((idx, art))
+METRICS.observe("stage.dedupe", time.monotonic() - _t_dedupe)
+METRICS.incr("articles.pending", len(pending))
+
+# Prefiltro local (data/prefilter_model.npz): los casos claros no gastan llamada de clasificación,
+# y su probabilidad sirve para priorizar el resto
+local_verdicts = {}
+p_relevant = {}
+prefilter = load_model()
+if prefilter is not None:
+    with METRICS.timer("stage.prefilter"):
+        for idx, art in pending:
+            p_relevant[art["id"]] = predict_proba(prefilter, art)
+            verdict = verdict_for_proba(p_relevant[art["id"]])
+            if verdict is not None:
+                local_verdicts[art["id"]] = verdict
+                art["decided_by"] = "prefilter"
+    n_pos = sum(local_verdicts.values())
+    METRICS.incr("prefilter.relevant", n_pos)
+    METRICS.incr("prefilter.rejected", len(local_verdicts) - n_pos)
+    print(f"[+] Prefiltro local: {n_pos} relevantes y {len(local_verdicts) - n_pos} descartadas sin Gemini; "
+          f"{len(pending) - len(local_verdicts)} van a Gemini", flush=True)
+
+def _apply_enrichment(art, enrich):
+    """Copia why/ideas válidos; si faltan, la noticia queda marcada para reenriquecer."""
+    if not apply_enrichment(art, enrich):
+        METRICS.incr("articles.needs_enrichment")
+
+def _retry_enrichment(store, limit):
+    """
+    Reenriquece relevantes de ejecuciones anteriores marcadas con needs_enrichment
+    (las más recientes primero, hasta `limit`). Devuelve ResourceExhausted si la cuota se acaba.
+    """
+    todo = [a for a in store.needs_enrichment()
+            if int(a.get("enrich_attempts") or 0) < ENRICH_MAX_ATTEMPTS][:limit]
+    if not todo:
+        return None
+    print(f"[+] Reenriqueciendo {len(todo)} relevantes incompletas de ejecuciones anteriores…", flush=True)
+    for art in todo:
+        if deadline.expired():
+            return None
+        art = dict(art)
+        try:
+            with METRICS.timer("collector.enrich"):
                 enrich = enrich_article_fields(art) or {}
-            except ResourceExhausted:
-                print(f"[{idx}/{total}] [⛔] Cuota agotada durante enriquecimiento.", flush=True)
-                _save_json(CURATED_PATH, curated)
-                _save_json(TRENDS_PATH, trends)
-                sys.exit(0)
-            if enrich.get("why_it_matters"):
-                art["why_it_matters"] = enrich["why_it_matters"]
-            if enrich.get("activation_ideas"):
-                art["activation_ideas"] = enrich["activation_ideas"]
-            trends.append(art)
-            print(f"[{idx}/{total}] [✓] Relevante", flush=True)
-        else:
-            print(f"[{idx}/{total}] [✗] Descartada", flush=True)
-        procesados_nuevos += 1
+        except ResourceExhausted as e:
+            return e
+        except GenerationError as e:
+            print(f"[!] Reenriquecimiento fallido: {e}", flush=True)
+            enrich = {"needs_enrichment": True}
+        _apply_enrichment(art, enrich)
+        store.update_trend(art)
+        METRICS.incr("articles.reenriched" if not art.get("needs_enrichment") else "articles.reenrich_failed")
+    return None
 
-    except ResourceExhausted as e:
-        print(f"[{idx}/{total}] [⛔] Sin claves válidas/cuota: {e}", flush=True)
-        print("[💾] Guardando progreso y saliendo…", flush=True)
-        _save_json(CURATED_PATH, curated)
-        _save_json(TRENDS_PATH, trends)
-        sys.exit(0)
+def _process_chunk(chunk):
+    """
+    Clasifica (y enriquece) un lote en un hilo del pool.
+    Devuelve (resultados [(idx, art, is_rel)], ResourceExhausted|None).
+    Si la cuota se agota a mitad, devuelve lo ya hecho junto con el error.
+    """
+    for idx, art in chunk:
+        print(f"[{idx}/{total}] [IA] Evaluando: {art.get('title', 'Sin título')[:90]}", flush=True)
 
+    verdicts = {art["id"]: local_verdicts[art["id"]] for _, art in chunk if art["id"] in local_verdicts}
+    to_classify = [art for _, art in chunk if art["id"] not in verdicts]
+    combined = {}
+    stop = None
+    t0 = time.monotonic()
+    try:
+        if SINGLE_PASS:
+            for art in to_classify:
+                combined[art["id"]] = classify_and_enrich(art)
+                verdicts[art["id"]] = combined[art["id"]].get("relevant", False)
+        elif to_classify:
+            verdicts.update(classify_batch(to_classify, size=BATCH_SIZE))
+    except ResourceExhausted as e:
+        stop = e
     except Exception as e:
-        print(f"[{idx}/{total}] [!] Error con el artículo: {e}", flush=True)
-        curated[art_id] = False
+        # Un error del modelo no es un "no relevante": lo no decidido vuelve a la cola
+        print(f"[!] Error clasificando: {e} → lo no decidido vuelve a la cola", flush=True)
+        METRICS.incr("collector.classify_error")
+    finally:
+        METRICS.observe("collector.classify", time.monotonic() - t0)
+
+    # Lo ya decidido (también antes de un corte) pasa por el mismo sellado, enriquecimiento y miniatura
+    results = []
+    for idx, art in chunk:
+        if art["id"] not in verdicts:
+            continue  # sin veredicto: vuelve a la cola, no cuenta como descartada
+        is_rel = bool(verdicts[art["id"]])
+        if is_rel and stop is not None and art["id"] not in combined:
+            continue  # sin cuota para enriquecerla: vuelve a la cola
+        # Lo decidido en local lleva la huella del modelo, no la del prompt
+        art["relevance_version"] = prefilter["version"] if art.get("decided_by") == "prefilter" else RELEVANCE_VERSION
+        if is_rel:
+            # Enriquecer con Gemini (why + ideas); en modo single-pass ya viene hecho
+            enrich = combined.get(art["id"]) or {}
+            if art["id"] not in combined:
+                try:
+                    with METRICS.timer("collector.enrich"):
+                        enrich = enrich_article_fields(art) or {}
+                except ResourceExhausted as e:
+                    print(f"[{idx}/{total}] [⛔] Cuota agotada durante enriquecimiento.", flush=True)
+                    return results, e
+                except GenerationError as e:
+                    print(f"[{idx}/{total}] [!] Enriquecimiento fallido: {e}", flush=True)
+                    enrich = {"needs_enrichment": True}
+            _apply_enrichment(art, enrich)
+            # Miniatura local para la tarjeta (solo las relevantes llegan al dashboard)
+            with METRICS.timer("collector.thumbnail"):
+                add_thumbnail(art)
+        results.append((idx, art, is_rel))
+    return results, stop
+
+# ─────────────────────────────────────────────────────────────
+# Plan: prioridad (relevancia esperada × frescura, reparto entre categorías) y
+# tanto como quepa en la cuota que queda hoy y en el presupuesto de tiempo
+# ─────────────────────────────────────────────────────────────
+# Sin prefiltro, la relevancia esperada es la tasa histórica
+prior = (sum(1 for v in curated.values() if v) / len(curated)) if curated else 0.4
+
+def _expected_calls(entry):
+    art = entry[1]
+    p = p_relevant.get(art["id"], prior)
+    if art["id"] in local_verdicts:
+        return 1.0 if local_verdicts[art["id"]] else 0.0  # solo el enriquecimiento
+    if SINGLE_PASS:
+        return 1.0
+    return 1.0 / BATCH_SIZE + p
+
+now_ts = time.time()
+ordered = fair_order([(priority(art, p_relevant.get(art["id"], prior), now_ts), art.get("category") or "", (idx, art))
+                      for idx, art in pending])
+capacity = call_capacity(deadline.remaining())
+limits = [c for c in (capacity["calls_left_today"], capacity["calls_in_time"]) if c is not None]
+selected, deferred = plan(ordered, _expected_calls, min(limits) if limits else None, MAX_TOTAL_ARTICLES)
+print(f"[+] Capacidad: {capacity['live_keys']} claves vivas, {capacity['calls_left_today']} llamadas hoy, "
+      f"{capacity['calls_in_time']} en el tiempo disponible → {len(selected)} a evaluar, {len(deferred)} a la cola", flush=True)
+METRICS.incr("articles.deferred", len(deferred))
+
+# Lotes en orden de prioridad: lo más valioso se evalúa primero
+step = 1 if SINGLE_PASS else BATCH_SIZE
+mode = "clasificar+enriquecer en 1 llamada" if SINGLE_PASS else f"lotes de {BATCH_SIZE}"
+chunks = [selected[i:i + step] for i in range(0, len(selected), step)]
+print(f"[+] Pendientes de evaluar: {len(selected)} ({mode}, {WORKERS} hilos)", flush=True)
+
+quota_error = None
+stop_reason = None
+leftover = []      # (idx, art) seleccionados que no llegaron a evaluarse
+in_flight = {}
+_t_classify = time.monotonic()
+with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+    while True:
+        # Se lanzan lotes a medida que hay hueco: así se puede parar por tiempo o cuota
+        # sin haber comprometido todo de antemano
+        while chunks and stop_reason is None and len(in_flight) < WORKERS * 2:
+            if deadline.expired():
+                stop_reason = "deadline"
+                print("[⏱] Presupuesto de tiempo agotado: no lanzo más lotes.", flush=True)
+                break
+            chunk = chunks.pop(0)
+            in_flight[pool.submit(_process_chunk, chunk)] = chunk
+        if not in_flight:
+            break
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for fut in done:
+            chunk = in_flight.pop(fut)
+            results, err = fut.result()
+            handled = {art["id"] for _, art, _ in results}
+            leftover.extend(entry for entry in chunk if entry[1]["id"] not in handled)
+            for idx, art, is_rel in results:
+                # Guardado incremental: una línea al diario por artículo
+                with METRICS.timer("store.record"):
+                    store.record(art["id"], is_rel, art)
+                if is_rel:
+                    print(f"[{idx}/{total}] [✓] Relevante", flush=True)
+                else:
+                    print(f"[{idx}/{total}] [✗] Descartada", flush=True)
+                METRICS.incr("articles.relevant" if is_rel else "articles.rejected")
+                procesados_nuevos += 1
+                # Sus duplicados heredan el veredicto sin llamada propia ni tarjeta repetida
+                for dup_idx, dup in dup_waiting.pop(art["id"], []):
+                    store.record(dup["id"], is_rel)
+                    print(f"[{dup_idx}/{total}] [≈] Hereda veredicto del original", flush=True)
+
+            if err is not None and quota_error is None:
+                # No lanzamos más lotes; los que ya están en vuelo terminan y se guardan
+                quota_error = err
+                stop_reason = "quota_exhausted"
+                print(f"[⛔] Sin claves válidas/cuota: {err}", flush=True)
+METRICS.observe("stage.classify", time.monotonic() - _t_classify)
+
+# Con cuota y tiempo de sobra, se completan relevantes que quedaron sin why/ideas
+if stop_reason is None and ENRICH_RETRY_PER_RUN > 0:
+    err = _retry_enrichment(store, ENRICH_RETRY_PER_RUN)
+    if err is not None:
+        stop_reason = "quota_exhausted"
+        print(f"[⛔] Sin cuota durante el reenriquecimiento: {err}", flush=True)
+
+# Cola para la próxima ejecución: lo no lanzado, lo cortado a medias y lo que no cupo en el plan,
+# en orden de prioridad y con sus duplicados detrás
+leftover.extend(entry for c in chunks for entry in c)
+to_queue = []
+for idx, art in leftover + deferred:
+    to_queue.append(art)
+    to_queue.extend(dup for _, dup in dup_waiting.pop(art["id"], []))
+queued_n = save_queue(to_queue, reason=stop_reason or ("capacity" if deferred else ""))
+if queued_n:
+    print(f"[💾] {queued_n} artículos en cola para la próxima ejecución ({stop_reason or 'capacidad'}).", flush=True)
+METRICS.incr("articles.queued", queued_n)
+
+with METRICS.timer("store.compact"):
+    store.compact()
+with METRICS.timer("store.dedupe_save"):
+    dedupe.save()
+
+# ETag/Last-Modified y marcas de agua: lo descargado y no evaluado ya está en la cola,
+# así que los feeds pueden avanzar siempre
+save_feed_state(feed_state)
+
+# Retención: lo muy antiguo y no guardado sale del conjunto caliente (data/trends/archive/)
+archived = store.apply_retention(keep_ids={a.get("id") for a in get_saved()})
+if archived:
+    print(f"[ℹ] Retención: {archived} artículos antiguos movidos a data/trends/archive/", flush=True)
+
+# Miniaturas (static/thumbs, se publican con los datos): solo las de guardadas y relevantes en caliente
+with METRICS.timer("store.prune_thumbs"):
+    pruned = prune_thumbnails(get_saved() + store.all_trends())
+if pruned:
+    print(f"[ℹ] Miniaturas: {pruned} fuera de static/thumbs (archivadas o por encima del tope)", flush=True)
 
-    # Guardado incremental
-    _save_json(CURATED_PATH, curated)
-    _save_json(TRENDS_PATH, trends)
+# Instantánea del dashboard (ventana por defecto de Radar, solo campos de tarjeta, gzip)
+with METRICS.timer("store.snapshot"):
+    snapshot_n = write_dashboard_snapshot()
+if snapshot_n is not None:
+    print(f"[💾] Instantánea del dashboard: {snapshot_n} tarjetas → data/dashboard_snapshot.json.gz", flush=True)
 
 # Resumen
-print(f"[ℹ] Resumen guardado: curated={len(curated)} entradas, trends={len(trends)} relevantes", flush=True)
+print(f"[ℹ] Resumen guardado: curated={len(curated)} entradas, trends={store.trend_count()} relevantes "
+      f"en {len(store.shards.months())} shards", flush=True)
 print(f"[ℹ] Ejemplos curated (hasta 3): {list(curated)[:3]}", flush=True)
-print(f"[ℹ] Ejemplos trends (hasta 1): {trends[:1]}", flush=True)
+print(f"[ℹ] {cache_summary()}", flush=True)
+_write_metrics(stop_reason or "completed")
 print(f"[✅] Proceso completado. Nuevos procesados: {procesados_nuevos}", flush=True)